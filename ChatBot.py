@@ -1,43 +1,38 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-import re
-import random
-import json
 import datetime
-from collections import defaultdict
+import itertools
+import queue
 import threading
+import traceback
 import webbrowser
 import os
+from collections import deque
 
-# Try to import NLTK for advanced features
-try:
-    import nltk
-    from nltk.sentiment import SentimentIntensityAnalyzer
-    from nltk.tokenize import word_tokenize
-    from nltk.corpus import stopwords
-    from nltk.stem import WordNetLemmatizer
-    NLTK_AVAILABLE = True
-    
-    # Download required NLTK data
-    try:
-        nltk.data.find('tokenizers/punkt')
-        nltk.data.find('corpora/stopwords')
-        nltk.data.find('sentiment/vader_lexicon')
-        nltk.data.find('corpora/wordnet')
-    except LookupError:
-        print("Downloading NLTK data...")
-        nltk.download('punkt', quiet=True)
-        nltk.download('stopwords', quiet=True)
-        nltk.download('vader_lexicon', quiet=True)
-        nltk.download('wordnet', quiet=True)
-        nltk.download('omw-1.4', quiet=True)
-        
-except ImportError:
-    NLTK_AVAILABLE = False
-    print("NLTK not available. Using basic text processing.")
+from chatbot_engine import ChatBotEngine
+from chatbot_knowledge import KnowledgeReloader, load_knowledge
+from chatbot_metrics import StageTimings
+from chatbot_nlp import NLTK_AVAILABLE, NLP_READY, NLP_LOADING, NLP_PENDING, ProcessNLPBackend
+from chatbot_storage import SessionJournal, exporter_for
+from chatbot_workers import MessageWorkerPool
 
 class AdvancedChatBot:
-    def __init__(self, root):
+    # Messages kept in the chat widget, and how many to page in at a time
+    DISPLAY_WINDOW = 200
+    DISPLAY_PAGE = 50
+    # Recent messages kept in RAM; older turns are read back from the history
+    DISPLAY_LOG_LIMIT = 400
+    
+    # Worker-thread UI updates are applied in batches at this interval
+    UI_FRAME_MS = 33
+    
+    # The Statistics tab refreshes itself at this interval while visible
+    STATS_REFRESH_MS = 1000
+    
+    # The draft is analyzed once typing pauses for this long
+    DRAFT_PAUSE_MS = 250
+    
+    def __init__(self, root, nlp_backend=None, session_dir=None, timings=True, knowledge_path=None):
         self.root = root
         self.root.title("🤖 Advanced AI ChatBot Studio")
         self.root.geometry("1200x800")
@@ -59,166 +54,59 @@ class AdvancedChatBot:
             'error': '#f85149'
         }
         
-        # Chat state
-        self.conversation_history = []
-        self.user_profile = {
-            'name': None,
-            'preferences': {},
-            'mood_history': [],
-            'topics_discussed': defaultdict(int)
-        }
+        # Conversation logic and session state, journaled to session_dir;
+        # per-stage latency is kept unless timings is False
+        journal = SessionJournal(session_dir) if session_dir else None
+        knowledge = load_knowledge(knowledge_path) if knowledge_path else None
+        self.engine = ChatBotEngine(nlp_backend=nlp_backend, journal=journal,
+                                    timings=StageTimings() if timings else None,
+                                    knowledge=knowledge)
+        restored = self.engine.resume()
+        
+        # Messages are processed in order by a small bounded pool
+        self.worker_pool = MessageWorkerPool(workers=2, max_pending=16)
+        
+        # Events posted by worker threads, drained once per frame
+        self.ui_events = deque()
+        self.export_running = False
+        
+        # Speculative analysis of the draft: the pending timer, the last
+        # draft analyzed and its generation, and the generations still queued
+        self.draft_timer = None
+        self.draft_text = ""
+        self.draft_generation = 0
+        self.queued_drafts = set()
+        
+        # Edits to the knowledge files are picked up in the background
+        self.knowledge_reloader = None
+        if knowledge_path:
+            self.knowledge_reloader = KnowledgeReloader(knowledge_path, self.on_knowledge_reload,
+                                                        source_hash=knowledge.source_hash).start()
         
-        # Bot personality settings
-        self.bot_settings = {
-            'personality': 'friendly',  # friendly, professional, humorous, technical
-            'response_style': 'detailed',  # brief, detailed, creative
-            'learning_mode': True,
-            'mood_detection': True
-        }
-        
-        # Initialize NLTK components if available
-        if NLTK_AVAILABLE:
-            self.sentiment_analyzer = SentimentIntensityAnalyzer()
-            self.lemmatizer = WordNetLemmatizer()
-            self.stop_words = set(stopwords.words('english'))
-        
-        self.setup_knowledge_base()
         self.setup_gui()
+        if restored:
+            self.show_restored_session(restored)
         self.greet_user()
-        
-    def setup_knowledge_base(self):
-        """Initialize the bot's knowledge base"""
-        self.knowledge_base = {
-            # Greetings and basic interactions
-            'greetings': {
-                'patterns': [r'\b(hi|hello|hey|greetings|good morning|good afternoon|good evening)\b'],
-                'responses': [
-                    "Hello! 👋 I'm your AI assistant. How can I help you today?",
-                    "Hi there! 😊 What would you like to chat about?",
-                    "Greetings! I'm here to help. What's on your mind?",
-                    "Hey! 🤖 Ready for an interesting conversation?"
-                ]
-            },
-            
-            # Farewells
-            'farewells': {
-                'patterns': [r'\b(bye|goodbye|see you|farewell|take care|exit|quit)\b'],
-                'responses': [
-                    "Goodbye! 👋 It was great chatting with you!",
-                    "See you later! 😊 Have a wonderful day!",
-                    "Take care! Feel free to come back anytime.",
-                    "Farewell! 🤖 Hope our conversation was helpful!"
-                ]
-            },
-            
-            # Questions about the bot
-            'bot_info': {
-                'patterns': [r'\b(who are you|what are you|your name|about you|tell me about yourself)\b'],
-                'responses': [
-                    "I'm an advanced AI chatbot! 🤖 I can help with questions, have conversations, and even detect your mood!",
-                    "I'm your friendly AI assistant, designed to chat, help, and learn from our conversations!",
-                    "I'm an intelligent chatbot with personality! I can discuss various topics and adapt to your communication style."
-                ]
-            },
-            
-            # How are you
-            'how_are_you': {
-                'patterns': [r'\b(how are you|how do you feel|what\'s up|how\'s it going)\b'],
-                'responses': [
-                    "I'm doing great! 😊 My circuits are buzzing with excitement to chat with you!",
-                    "I'm fantastic! 🌟 Every conversation energizes my algorithms!",
-                    "I'm wonderful! Ready to tackle any topic you throw at me! 💪"
-                ]
-            },
-            
-            # Technology topics
-            'technology': {
-                'patterns': [r'\b(programming|coding|python|javascript|ai|artificial intelligence|machine learning|computer|software|hardware|tech)\b'],
-                'responses': [
-                    "Technology is fascinating! 💻 I love discussing programming, AI, and the latest tech trends. What specific area interests you?",
-                    "Oh, a fellow tech enthusiast! 🚀 From Python to AI, there's so much to explore. What would you like to know?",
-                    "Technology is evolving so rapidly! Whether it's coding, AI, or hardware, I'm here to discuss it all! 🔧"
-                ]
-            },
-            
-            # Weather
-            'weather': {
-                'patterns': [r'\b(weather|rain|sunny|cloudy|temperature|forecast|climate)\b'],
-                'responses': [
-                    "I wish I could check the weather for you! 🌤️ Try asking a weather service or checking your local forecast.",
-                    "Weather affects our mood so much! ☀️🌧️ How's the weather treating you today?",
-                    "I can't access real-time weather data, but I'd love to chat about how weather impacts our daily lives! 🌈"
-                ]
-            },
-            
-            # Hobbies and interests
-            'hobbies': {
-                'patterns': [r'\b(hobby|hobbies|interests|music|movies|books|reading|gaming|sports|art|cooking)\b'],
-                'responses': [
-                    "Hobbies make life so much richer! 🎨 I'd love to hear about your interests. What do you enjoy doing in your free time?",
-                    "That sounds interesting! 🎯 Hobbies are a great way to express creativity and relax. Tell me more!",
-                    "I find human hobbies fascinating! 🎪 From music to sports to art - there's so much diversity in what people enjoy!"
-                ]
-            },
-            
-            # Emotions and mood
-            'emotions': {
-                'patterns': [r'\b(sad|happy|angry|frustrated|excited|worried|anxious|depressed|joyful|stressed)\b'],
-                'responses': [
-                    "I understand emotions can be complex. 💙 Would you like to talk about what's affecting your mood?",
-                    "Feelings are important and valid. 🤗 I'm here to listen if you want to share what's on your mind.",
-                    "Emotions are part of what makes us human (and interesting to an AI like me!). How are you feeling right now?"
-                ]
-            },
-            
-            # Help and assistance
-            'help': {
-                'patterns': [r'\b(help|assist|support|confused|don\'t know|stuck|problem)\b'],
-                'responses': [
-                    "I'm here to help! 🆘 What specific problem or question can I assist you with?",
-                    "No worries! 🤝 Everyone needs help sometimes. Tell me what's troubling you and let's work through it together.",
-                    "That's what I'm here for! 💡 Describe your issue and I'll do my best to provide useful guidance."
-                ]
-            },
-            
-            # Learning and education
-            'learning': {
-                'patterns': [r'\b(learn|study|education|school|university|course|tutorial|knowledge|teach)\b'],
-                'responses': [
-                    "Learning is amazing! 📚 I love helping people discover new knowledge. What subject interests you?",
-                    "Education opens so many doors! 🎓 Whether it's formal study or self-learning, I'm here to support your journey.",
-                    "Knowledge is power! 💪 I can help explain concepts, suggest resources, or just discuss learning strategies."
-                ]
-            },
-            
-            # Default responses for unmatched input
-            'default': [
-                "That's interesting! 🤔 Can you tell me more about that?",
-                "I'm not sure I fully understand, but I'd love to learn more! 💭",
-                "Hmm, that's a new one for me! 🧠 Could you elaborate?",
-                "I find that topic intriguing! 🌟 What's your perspective on it?",
-                "Tell me more! 📖 I'm always eager to learn from our conversations."
-            ]
-        }
-        
-        # Advanced conversation topics
-        self.advanced_topics = {
-            'philosophy': [
-                "Philosophy makes me think about consciousness and existence! 🤔 What philosophical questions fascinate you?",
-                "The big questions of life! 💭 From ethics to metaphysics, philosophy explores the deepest aspects of reality.",
-                "I love philosophical discussions! 🧠 They challenge us to think beyond the obvious."
-            ],
-            'science': [
-                "Science is the quest to understand our universe! 🔬 From quantum physics to biology, what area captivates you?",
-                "The scientific method has given us incredible insights! 🌌 What scientific discoveries amaze you most?",
-                "Science fiction often becomes science fact! 🚀 I'm fascinated by how human curiosity drives discovery."
-            ],
-            'creativity': [
-                "Creativity is one of humanity's greatest gifts! 🎨 How do you express your creative side?",
-                "Art, music, writing - creativity takes so many forms! 🌈 What inspires your imagination?",
-                "I'm amazed by human creativity! 💫 Even as an AI, I try to be creative in my responses."
-            ]
-        }
+        self.root.after(self.UI_FRAME_MS, self.drain_ui_events)
+        self.root.after(self.STATS_REFRESH_MS, self.refresh_statistics)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # NLP resources finish loading on a background thread; Tk is only
+        # touched from the UI thread's event drain
+        self.engine.nlp.add_listener(lambda state: self.post_ui_event('call', self.on_nlp_state_change, state))
+        self.update_nlp_status()
+        
+    @property
+    def conversation_history(self):
+        return self.engine.conversation_history
+    
+    @property
+    def user_profile(self):
+        return self.engine.user_profile
+    
+    @property
+    def bot_settings(self):
+        return self.engine.bot_settings
     
     def setup_gui(self):
         """Setup the graphical user interface"""
@@ -275,6 +163,20 @@ class AdvancedChatBot:
         )
         self.chat_display.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
+        # Display index i is archived turn i (read from the conversation
+        # history when shown) for i < display_archived, then the recent
+        # message display_log[i - display_archived]. The widget only holds
+        # indices display_start..display_end-1
+        self.display_log = deque()
+        self.display_archived = 0
+        # Turn number the next sent message will get
+        self.turns_sent = self.conversation_history.available
+        self.display_start = 0
+        self.display_end = 0
+        self.display_lines = deque()  # line count of each message in the widget
+        self.display_paging = False
+        self.chat_display.config(yscrollcommand=self.on_chat_scroll)
+        
         # Configure text tags for styling
         self.chat_display.tag_config('user', foreground=self.colors['user_bubble'], font=('Segoe UI', 11, 'bold'))
         self.chat_display.tag_config('bot', foreground=self.colors['bot_bubble'], font=('Segoe UI', 11, 'bold'))
@@ -308,6 +210,7 @@ class AdvancedChatBot:
         # Bind Enter key
         self.user_input.bind('<Return>', self.on_enter)
         self.user_input.bind('<Shift-Return>', self.on_shift_enter)
+        self.user_input.bind('<KeyRelease>', self.on_draft_changed)
         
         # Quick action buttons
         quick_frame = tk.Frame(chat_frame, bg=self.colors['bg_medium'])
@@ -335,7 +238,7 @@ class AdvancedChatBot:
         settings_label.pack(pady=10)
         
         # Notebook for different setting categories
-        notebook = ttk.Notebook(parent)
+        notebook = self.settings_notebook = ttk.Notebook(parent)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # Personality tab
@@ -343,7 +246,7 @@ class AdvancedChatBot:
         notebook.add(personality_frame, text=" 🎭 Personality ")
         
         # Stats tab
-        stats_frame = tk.Frame(notebook, bg=self.colors['bg_light'])
+        stats_frame = self.stats_frame = tk.Frame(notebook, bg=self.colors['bg_light'])
         notebook.add(stats_frame, text=" 📊 Statistics ")
         
         # Features tab
@@ -425,6 +328,13 @@ class AdvancedChatBot:
                              bg=self.colors['accent'], fg='white',
                              font=('Segoe UI', 9))
         update_btn.pack(pady=10)
+        
+        if self.engine.timings is not None:
+            dump_btn = tk.Button(parent, text="⏱️ Dump Timings",
+                               command=self.dump_timings,
+                               bg=self.colors['bg_medium'], fg=self.colors['text_primary'],
+                               font=('Segoe UI', 9))
+            dump_btn.pack(pady=(0, 10))
     
     def setup_features_panel(self, parent):
         """Setup features information"""
@@ -483,41 +393,298 @@ class AdvancedChatBot:
                                           bg=self.colors['bg_medium'], fg=self.colors['text_secondary'],
                                           font=('Segoe UI', 10))
         self.message_count_label.pack(side=tk.RIGHT, padx=10, pady=5)
+        
+        # NLP resource state
+        self.nlp_status_label = tk.Label(self.status_frame, text="",
+                                       bg=self.colors['bg_medium'], fg=self.colors['text_secondary'],
+                                       font=('Segoe UI', 10))
+        self.nlp_status_label.pack(side=tk.RIGHT, padx=10, pady=5)
+    
+    def update_nlp_status(self):
+        """Show the NLP resource state in the status bar"""
+        state = self.engine.nlp.state
+        if state == NLP_READY:
+            text, color = "🧠 NLP Ready", self.colors['success']
+        elif state in (NLP_PENDING, NLP_LOADING):
+            text, color = "⏳ NLP Loading...", self.colors['warning']
+        else:
+            text, color = "💭 Basic Mode", self.colors['text_secondary']
+        self.nlp_status_label.config(text=text, fg=color)
+    
+    def on_nlp_state_change(self, state):
+        """Handle NLP resources finishing their warm-up"""
+        self.update_nlp_status()
+        if state == NLP_READY:
+            self.add_message("System", "🧠 Advanced NLP features enabled - I can detect mood and understand context better!", "mood")
+        elif state != NLP_LOADING:
+            self.add_message("System", "💭 NLP resources could not be loaded - continuing in basic mode.", "mood")
     
     def greet_user(self):
         """Initial greeting"""
         greeting = "🤖 Hello! I'm your Advanced AI ChatBot! I'm here to chat, help, and learn from our conversation. What would you like to talk about today?"
         self.add_message("ChatBot", greeting, "bot")
         
-        if NLTK_AVAILABLE:
+        if self.engine.nlp.ready:
             self.add_message("System", "🧠 Advanced NLP features enabled - I can detect mood and understand context better!", "mood")
+        elif NLTK_AVAILABLE:
+            self.add_message("System", "⏳ Loading advanced NLP features in the background - basic mode until they're ready.", "mood")
         else:
             self.add_message("System", "💭 Running in basic mode - install NLTK for advanced features!", "mood")
     
-    def add_message(self, sender, message, tag=""):
-        """Add message to chat display"""
-        self.chat_display.config(state=tk.NORMAL)
-        
+    def show_restored_session(self, total):
+        """Show the turns restored from the session journal"""
+        entries = []
+        first = self.conversation_history.available - len(self.conversation_history)
+        for index, turn in enumerate(self.conversation_history, first):
+            timestamp = turn.datetime.strftime("%H:%M")
+            entries.append((timestamp, "You", turn.user, "user", index))
+            if turn.bot is not None:
+                entries.append((timestamp, "ChatBot", turn.bot, "bot", index))
+        self.display_log.extend(entries)
+        self.trim_display_log()
+        self.render_display_window(self.display_size() - self.DISPLAY_WINDOW)
+        self.add_message("System", f"📂 Restored your last session ({total} messages).", "mood")
+    
+    def add_message(self, sender, message, tag="", turn=None):
+        """Add message to chat display; turn is the history index it belongs to"""
+        self.add_messages([(sender, message, tag, turn)])
+    
+    def add_messages(self, messages):
+        """Add (sender, message, tag, turn) tuples with a single insert and scroll"""
         # Add timestamp
         timestamp = datetime.datetime.now().strftime("%H:%M")
+        was_at_end = self.display_end == self.display_size()
+        entries = [(timestamp, sender, message, tag, turn) for sender, message, tag, turn in messages]
+        archived = self.display_archived
+        logged = len(self.display_log) + len(entries)
+        # The first message shown, in case trimming archives it below
+        first_shown = None
+        if self.display_start >= archived and self.display_start - archived < len(self.display_log):
+            first_shown = self.display_log[self.display_start - archived]
+        self.display_log.extend(entries)
+        moved = self.trim_display_log()
+        trimmed = logged - len(self.display_log)
+        
+        if not was_at_end:
+            # The user is paging through older messages; leave the view
+            # where it is and let them page down to the new ones
+            if self.display_start >= archived + trimmed:
+                # Only messages before the window were archived
+                self.display_start += moved
+                self.display_end += moved
+            elif self.display_end > archived:
+                # Messages shown were archived and renumbered by turn;
+                # redraw the same messages at the same scroll position
+                turn = first_shown[4] if first_shown is not None else None
+                if turn is not None and turn < self.display_archived:
+                    start = turn
+                else:
+                    start = self.display_start if self.display_start < archived else self.display_start + moved
+                top = self.chat_display.yview()[0]
+                self.render_display_window(start)
+                self.chat_display.yview_moveto(top)
+        elif len(entries) >= self.DISPLAY_WINDOW:
+            # The batch fills the whole window; redraw the latest window
+            self.render_display_window(self.display_size() - self.DISPLAY_WINDOW)
+        else:
+            # The window is within the recent messages, which trimming renumbered
+            self.display_start += moved
+            self.display_end += moved
+            chunks = []
+            for entry in entries:
+                entry_chunks, lines = self.format_display_entry(entry)
+                chunks.extend(entry_chunks)
+                self.display_lines.append(lines)
+            self.display_end += len(entries)
+            
+            self.chat_display.config(state=tk.NORMAL)
+            self.chat_display.insert(tk.END, *chunks)
+            
+            # Trim the oldest messages in one delete
+            dropped = 0
+            while len(self.display_lines) > self.DISPLAY_WINDOW:
+                dropped += self.display_lines.popleft()
+                self.display_start += 1
+            if dropped:
+                self.chat_display.delete("1.0", f"{dropped + 1}.0")
+            self.chat_display.config(state=tk.DISABLED)
+        if was_at_end:
+            self.chat_display.see(tk.END)
         
+        # Update message count
+        count = self.conversation_history.total
+        self.message_count_label.config(text=f"Messages: {count}")
+    
+    def display_size(self):
+        return self.display_archived + len(self.display_log)
+    
+    def trim_display_log(self):
+        """Archive the oldest messages past DISPLAY_LOG_LIMIT; return the display index shift
+        
+        A dropped message's turn joins the archived turns, read back from the
+        conversation history when paged in; messages without a turn are gone.
+        """
+        log = self.display_log
+        moved = 0
+        while log and (len(log) > self.DISPLAY_LOG_LIMIT
+                       or (log[0][4] is not None and log[0][4] < self.display_archived)):
+            turn = log.popleft()[4]
+            moved -= 1
+            if turn is not None and turn >= self.display_archived:
+                moved += turn + 1 - self.display_archived
+                self.display_archived = turn + 1
+        return moved
+    
+    def display_entries(self, start, end):
+        """Return the display entries start..end-1"""
+        entries = []
+        archived = self.display_archived
+        if start < archived:
+            turns = self.conversation_history.read(start, min(end, archived))
+            for index, turn in enumerate(turns, start):
+                entries.append((turn.datetime.strftime("%H:%M"), None, turn, "", index))
+        entries.extend(itertools.islice(self.display_log, max(0, start - archived), max(0, end - archived)))
+        return entries
+    
+    def format_display_entry(self, entry):
+        """Return (text/tag chunks, line count) for one display entry"""
+        timestamp, sender, message, tag, _ = entry
+        if sender is None:
+            # An archived turn; message is the Turn
+            chunks, lines = self.format_display_entry((timestamp, "You", message.user, "user", None))
+            if message.bot is not None:
+                bot_chunks, bot_lines = self.format_display_entry((timestamp, "ChatBot", message.bot, "bot", None))
+                chunks += bot_chunks
+                lines += bot_lines
+            return chunks, lines
         if sender == "You":
-            prefix = f"[{timestamp}] 👤 You: "
-            self.chat_display.insert(tk.END, prefix, "user")
+            prefix, prefix_tag = f"[{timestamp}] 👤 You: ", "user"
         elif sender == "ChatBot":
-            prefix = f"[{timestamp}] 🤖 ChatBot: "
-            self.chat_display.insert(tk.END, prefix, "bot")
+            prefix, prefix_tag = f"[{timestamp}] 🤖 ChatBot: ", "bot"
         else:
-            prefix = f"[{timestamp}] ℹ️ {sender}: "
-            self.chat_display.insert(tk.END, prefix, "timestamp")
+            prefix, prefix_tag = f"[{timestamp}] ℹ️ {sender}: ", "timestamp"
         
-        self.chat_display.insert(tk.END, f"{message}\n\n", tag)
+        return (prefix, prefix_tag, f"{message}\n\n", tag), prefix.count('\n') + message.count('\n') + 2
+    
+    def insert_display_entry(self, index, entry):
+        """Insert one message at index; return the number of lines it takes"""
+        chunks, lines = self.format_display_entry(entry)
+        self.chat_display.insert(index, *chunks)
+        return lines
+    
+    def post_ui_event(self, kind, *args):
+        """Queue a UI update from any thread ('message', 'status', 'latency' or 'call')"""
+        self.ui_events.append((kind, args))
+    
+    def drain_ui_events(self):
+        """Apply queued UI updates in one batch, then schedule the next frame"""
+        try:
+            messages = []
+            status = None
+            latencies = []
+            while self.ui_events:
+                kind, args = self.ui_events.popleft()
+                if kind == 'message':
+                    messages.append(args)
+                elif kind == 'latency':
+                    latencies.append(args)
+                elif kind == 'status':
+                    status = args  # Only the latest status matters
+                elif kind == 'call':
+                    self.apply_ui_event(*args)
+            
+            if messages:
+                self.apply_ui_event(self.add_messages, messages)
+            for stage, start in latencies:
+                self.engine.timings.since(stage, start)
+            if status is not None:
+                text, color = status
+                self.apply_ui_event(self.status_label.config, text=text, fg=self.colors[color])
+        finally:
+            self.root.after(self.UI_FRAME_MS, self.drain_ui_events)
+    
+    def apply_ui_event(self, func, *args, **kwargs):
+        """Run one UI update; a failure is logged without losing the rest of the batch"""
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            traceback.print_exc()
+    
+    def drop_display_entry(self, first):
+        """Remove the first or last message from the widget"""
+        if first:
+            lines = self.display_lines.popleft()
+            self.chat_display.delete("1.0", f"{lines + 1}.0")
+            self.display_start += 1
+        else:
+            lines = self.display_lines.pop()
+            start_line = sum(self.display_lines) + 1
+            self.chat_display.delete(f"{start_line}.0", tk.END)
+            self.display_end -= 1
+    
+    def render_display_window(self, start):
+        """Redraw the widget with the messages from start onwards"""
+        self.display_start = max(0, start)
+        self.display_end = min(self.display_size(), self.display_start + self.DISPLAY_WINDOW)
+        self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.delete("1.0", tk.END)
+        chunks = []
+        self.display_lines = deque()
+        for entry in self.display_entries(self.display_start, self.display_end):
+            entry_chunks, lines = self.format_display_entry(entry)
+            chunks.extend(entry_chunks)
+            self.display_lines.append(lines)
+        if chunks:
+            self.chat_display.insert(tk.END, *chunks)
+        self.chat_display.config(state=tk.DISABLED)
+    
+    def on_chat_scroll(self, first, last):
+        """Page older or newer messages in when the view reaches an edge"""
+        self.chat_display.vbar.set(first, last)
+        if self.display_paging:
+            return
+        if float(first) <= 0.0 and self.display_start > 0:
+            self.display_paging = True
+            self.root.after_idle(self.page_older)
+        elif float(last) >= 1.0 and self.display_end < self.display_size():
+            self.display_paging = True
+            self.root.after_idle(self.page_newer)
+    
+    def page_older(self):
+        """Load the previous page of messages above the current view"""
+        count = min(self.DISPLAY_PAGE, self.display_start)
+        entries = self.display_entries(self.display_start - count, self.display_start)
+        self.chat_display.config(state=tk.NORMAL)
+        added = 0
+        for entry in reversed(entries):
+            lines = self.insert_display_entry("1.0", entry)
+            self.display_lines.appendleft(lines)
+            added += lines
+        self.display_start -= count
+        while len(self.display_lines) > self.DISPLAY_WINDOW:
+            self.drop_display_entry(first=False)
         self.chat_display.config(state=tk.DISABLED)
-        self.chat_display.see(tk.END)
         
-        # Update message count
-        count = len(self.conversation_history)
-        self.message_count_label.config(text=f"Messages: {count}")
+        # Keep the message the user was looking at in place
+        self.chat_display.yview_moveto(added / max(1, sum(self.display_lines)))
+        self.display_paging = False
+    
+    def page_newer(self):
+        """Load the next page of messages below the current view"""
+        count = min(self.DISPLAY_PAGE, self.display_size() - self.display_end)
+        entries = self.display_entries(self.display_end, self.display_end + count)
+        self.chat_display.config(state=tk.NORMAL)
+        first_new_line = sum(self.display_lines) + 1
+        for entry in entries:
+            self.display_lines.append(self.insert_display_entry(tk.END, entry))
+        self.display_end += count
+        while len(self.display_lines) > self.DISPLAY_WINDOW:
+            first_new_line -= self.display_lines[0]
+            self.drop_display_entry(first=True)
+        self.chat_display.config(state=tk.DISABLED)
+        
+        self.chat_display.see(f"{max(1, first_new_line)}.0")
+        self.display_paging = False
     
     def send_message(self):
         """Process and send user message"""
@@ -525,240 +692,87 @@ class AdvancedChatBot:
         if not user_text:
             return
         
+        # Queue for the worker pool; keep the draft if it is full
+        try:
+            self.worker_pool.submit('chat', self.process_message, (user_text,), block=False)
+        except queue.Full:
+            self.status_label.config(text="⏳ Still working on earlier messages...", fg=self.colors['warning'])
+            return
+        
         # Add user message to display
-        self.add_message("You", user_text, "user")
+        self.add_message("You", user_text, "user", self.turns_sent)
+        self.turns_sent += 1
+        self.cancel_draft_timer()
         
         # Clear input
         self.user_input.delete("1.0", tk.END)
         
-        # Process in background thread
-        threading.Thread(target=self.process_message, args=(user_text,), daemon=True).start()
-        
         # Update status
         self.status_label.config(text="🤔 ChatBot thinking...", fg=self.colors['warning'])
     
     def process_message(self, user_text):
         """Process user message and generate response"""
         try:
-            # Store conversation
-            self.conversation_history.append({
-                'user': user_text,
-                'timestamp': datetime.datetime.now(),
-                'mood': self.detect_mood(user_text) if NLTK_AVAILABLE and self.bot_settings['mood_detection'] else None
-            })
-            
-            # Analyze user input
-            analysis = self.analyze_input(user_text)
+            response = self.engine.respond(user_text)
+            turn = self.conversation_history.available - 1
             
-            # Generate response
-            response = self.generate_response(user_text, analysis)
+            # Add response to chat; the time until it is shown is the
+            # UI round-trip
+            self.post_ui_event('message', "ChatBot", response, "bot", turn)
+            if self.engine.timings is not None:
+                self.post_ui_event('latency', 'ui', self.engine.timings.now())
             
-            # Add response to chat
-            self.root.after(0, lambda: self.add_message("ChatBot", response, "bot"))
-            
-            # Store bot response
-            self.conversation_history[-1]['bot'] = response
-            
-            # Update learning
-            if self.bot_settings['learning_mode']:
-                self.update_learning(user_text, analysis)
-            
-            # Update status
-            self.root.after(0, lambda: self.status_label.config(text="🟢 ChatBot Ready", fg=self.colors['success']))
+            # Update status once the last queued message is answered
+            if self.worker_pool.pending - len(self.queued_drafts) <= 1:
+                self.post_ui_event('status', "🟢 ChatBot Ready", 'success')
             
         except Exception as e:
             error_msg = "Sorry, I encountered an error processing your message. Please try again!"
-            self.root.after(0, lambda: self.add_message("ChatBot", error_msg, "bot"))
-            self.root.after(0, lambda: self.status_label.config(text="⚠️ Error occurred", fg=self.colors['error']))
-    
-    def analyze_input(self, text):
-        """Analyze user input for patterns and intent"""
-        analysis = {
-            'categories': [],
-            'keywords': [],
-            'sentiment': None,
-            'intent': 'unknown',
-            'entities': []
-        }
-        
-        text_lower = text.lower()
-        
-        # Check knowledge base patterns
-        for category, data in self.knowledge_base.items():
-            if category == 'default':
-                continue
-                
-            for pattern in data.get('patterns', []):
-                if re.search(pattern, text_lower):
-                    analysis['categories'].append(category)
-                    break
-        
-        # Extract keywords (if NLTK available)
-        if NLTK_AVAILABLE:
-            try:
-                tokens = word_tokenize(text_lower)
-                keywords = [self.lemmatizer.lemmatize(word) for word in tokens 
-                           if word.isalpha() and word not in self.stop_words]
-                analysis['keywords'] = keywords[:10]  # Top 10 keywords
-                
-                # Sentiment analysis
-                if self.bot_settings['mood_detection']:
-                    analysis['sentiment'] = self.detect_mood(text)
-                    
-            except Exception:
-                pass
-        
-        # Simple entity detection
-        entities = []
-        # Detect names (capitalized words that aren't at sentence start)
-        words = text.split()
-        for i, word in enumerate(words):
-            if word[0].isupper() and i > 0 and words[i-1][-1] not in '.!?':
-                entities.append(word)
-        analysis['entities'] = entities
-        
-        # Determine intent
-        if analysis['categories']:
-            analysis['intent'] = analysis['categories'][0]
-        elif any(word in text_lower for word in ['?', 'what', 'how', 'why', 'when', 'where']):
-            analysis['intent'] = 'question'
-        elif any(word in text_lower for word in ['please', 'can you', 'could you', 'help']):
-            analysis['intent'] = 'request'
-        
-        return analysis
-    
-    def generate_response(self, user_text, analysis):
-        """Generate appropriate response based on analysis"""
-        # Check for specific patterns first
-        if analysis['categories']:
-            category = analysis['categories'][0]
-            if category in self.knowledge_base:
-                responses = self.knowledge_base[category]['responses']
-                base_response = random.choice(responses)
-                
-                # Customize based on personality
-                return self.customize_response(base_response, analysis)
-        
-        # Check for advanced topics
-        for topic, responses in self.advanced_topics.items():
-            if any(keyword in user_text.lower() for keyword in [topic]):
-                base_response = random.choice(responses)
-                return self.customize_response(base_response, analysis)
-        
-        # Handle user name detection and storage
-        if not self.user_profile['name'] and any(word in user_text.lower() for word in ['my name is', 'i am', "i'm"]):
-            name = self.extract_name(user_text)
-            if name:
-                self.user_profile['name'] = name
-                return f"Nice to meet you, {name}! 😊 I'll remember your name for our future conversations."
-        
-        # Use name if available
-        name_prefix = f"{self.user_profile['name']}, " if self.user_profile['name'] else ""
-        
-        # Generate contextual response
-        if analysis['intent'] == 'question':
-            responses = [
-                f"{name_prefix}That's a great question! 🤔 While I don't have specific data on that, I'd love to explore the topic with you.",
-                f"{name_prefix}Interesting question! 💭 What specifically about this topic would you like to discuss?",
-                f"{name_prefix}I appreciate your curiosity! 🌟 Let me think about that..."
-            ]
-        elif analysis['intent'] == 'request':
-            responses = [
-                f"{name_prefix}I'd be happy to help! 🤝 Could you provide more details about what you need?",
-                f"{name_prefix}Of course! 💪 Tell me more about what assistance you're looking for.",
-                f"{name_prefix}I'm here to help! 🎯 What specifically can I do for you?"
-            ]
-        else:
-            # Use default responses
-            responses = self.knowledge_base['default']
-        
-        base_response = random.choice(responses)
-        return self.customize_response(base_response, analysis)
-    
-    def customize_response(self, base_response, analysis):
-        """Customize response based on personality and mood"""
-        response = base_response
-        
-        # Add mood acknowledgment if available
-        if analysis.get('sentiment') and self.bot_settings['mood_detection']:
-            mood = analysis['sentiment']
-            if mood['compound'] < -0.5:
-                response = f"I sense you might be feeling down. 💙 {response}"
-            elif mood['compound'] > 0.5:
-                response = f"I can feel your positive energy! ✨ {response}"
-        
-        # Adjust for personality
-        personality = self.bot_settings['personality']
-        
-        if personality == 'professional':
-            response = response.replace('!', '.').replace('😊', '').replace('🤗', '')
-        elif personality == 'humorous':
-            jokes = [" (I crack myself up! 😄)", " *virtual dad joke incoming*", " (That's my attempt at humor! 🤪)"]
-            if random.random() < 0.3:  # 30% chance to add humor
-                response += random.choice(jokes)
-        elif personality == 'technical':
-            if any(word in response.lower() for word in ['technology', 'programming', 'code']):
-                response += " Would you like to dive deeper into the technical aspects?"
-        
-        # Adjust for response style
-        style = self.bot_settings['response_style']
-        if style == 'brief':
-            # Shorten response
-            response = response.split('.')[0] + '.'
-        elif style == 'creative':
-            # Add creative elements
-            if random.random() < 0.4:
-                creative_additions = [
-                    " ✨ Life is full of interesting conversations!",
-                    " 🌈 Every chat teaches me something new!",
-                    " 🚀 Our conversation is taking off!"
-                ]
-                response += random.choice(creative_additions)
-        
-        return response
-    
-    def detect_mood(self, text):
-        """Detect mood using sentiment analysis"""
-        if not NLTK_AVAILABLE:
-            return None
-            
+            self.post_ui_event('message', "ChatBot", error_msg, "bot", None)
+            self.post_ui_event('status', "⚠️ Error occurred", 'error')
+    
+    def on_draft_changed(self, event=None):
+        """Analyze the draft once typing pauses (debounced)"""
+        self.cancel_draft_timer()
+        self.draft_timer = self.root.after(self.DRAFT_PAUSE_MS, self.analyze_draft)
+    
+    def cancel_draft_timer(self):
+        if self.draft_timer is not None:
+            self.root.after_cancel(self.draft_timer)
+            self.draft_timer = None
+    
+    def analyze_draft(self):
+        """Queue analysis of the current draft so sending it hits the analysis cache
+        
+        Drafts share the 'chat' lane, so a message sent right away waits for
+        its draft's analysis instead of repeating it. Queued drafts that
+        have been typed over are skipped.
+        """
+        self.draft_timer = None
+        draft = self.user_input.get("1.0", tk.END).strip()
+        if draft == self.draft_text:
+            return
+        self.draft_text = draft
+        if not draft:
+            return
+        self.draft_generation += 1
+        generation = self.draft_generation
+        # Added before submitting: a worker may finish the job before submit returns
+        self.queued_drafts.add(generation)
         try:
-            scores = self.sentiment_analyzer.polarity_scores(text)
-            return scores
-        except Exception:
-            return None
-    
-    def extract_name(self, text):
-        """Extract user name from text"""
-        patterns = [
-            r"my name is (\w+)",
-            r"i am (\w+)",
-            r"i'm (\w+)",
-            r"call me (\w+)"
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text.lower())
-            if match:
-                return match.group(1).title()
-        return None
-    
-    def update_learning(self, user_text, analysis):
-        """Update bot's learning from conversation"""
-        # Track topics discussed
-        for keyword in analysis.get('keywords', []):
-            self.user_profile['topics_discussed'][keyword] += 1
-        
-        # Store mood history
-        if analysis.get('sentiment'):
-            self.user_profile['mood_history'].append({
-                'timestamp': datetime.datetime.now(),
-                'sentiment': analysis['sentiment']
-            })
-            
-            # Keep only last 50 mood entries
-            if len(self.user_profile['mood_history']) > 50:
-                self.user_profile['mood_history'].pop(0)
+            self.worker_pool.submit('chat', self.process_draft, (draft, generation), block=False)
+        except (queue.Full, RuntimeError):
+            # Busy or closing: the draft is simply analyzed when sent
+            self.queued_drafts.discard(generation)
+    
+    def process_draft(self, draft, generation):
+        """Analyze a draft into the engine's cache unless a newer one replaced it"""
+        try:
+            if generation == self.draft_generation:
+                # Kept out of the latency and cache statistics: the draft may never be sent
+                self.engine.analyze_input(draft, speculative=True)
+        finally:
+            self.queued_drafts.discard(generation)
     
     def update_personality(self):
         """Update bot personality"""
@@ -791,86 +805,54 @@ class AdvancedChatBot:
         self.stats_text.insert("1.0", stats)
         self.stats_text.config(state=tk.DISABLED)
     
+    def refresh_statistics(self):
+        """Redraw the statistics every STATS_REFRESH_MS while their tab is shown"""
+        if self.settings_notebook.select() == str(self.stats_frame):
+            self.update_statistics()
+        self.root.after(self.STATS_REFRESH_MS, self.refresh_statistics)
+    
     def generate_statistics(self):
         """Generate conversation statistics"""
-        total_messages = len(self.conversation_history)
-        
-        if total_messages == 0:
-            return "📊 No conversation data yet!\n\nStart chatting to see statistics."
-        
-        # Calculate statistics
-        user_messages = sum(1 for msg in self.conversation_history if 'user' in msg)
-        
-        # Most discussed topics
-        top_topics = sorted(self.user_profile['topics_discussed'].items(), 
-                          key=lambda x: x[1], reverse=True)[:5]
-        
-        # Average mood (if available)
-        avg_mood = "N/A"
-        if self.user_profile['mood_history'] and NLTK_AVAILABLE:
-            mood_scores = [m['sentiment']['compound'] for m in self.user_profile['mood_history']]
-            avg_score = sum(mood_scores) / len(mood_scores)
-            if avg_score > 0.1:
-                avg_mood = "😊 Positive"
-            elif avg_score < -0.1:
-                avg_mood = "😔 Negative"
-            else:
-                avg_mood = "😐 Neutral"
-        
-        # Session duration
-        if self.conversation_history:
-            session_start = self.conversation_history[0]['timestamp']
-            session_duration = datetime.datetime.now() - session_start
-            duration_str = str(session_duration).split('.')[0]  # Remove microseconds
-        else:
-            duration_str = "0:00:00"
+        stats = self.engine.generate_statistics()
         
-        stats = f"""📊 Conversation Statistics
-
-💬 Total Messages: {total_messages}
-👤 Your Messages: {user_messages}
-🤖 Bot Responses: {total_messages - user_messages}
-
-⏱️ Session Duration: {duration_str}
-👤 Your Name: {self.user_profile['name'] or 'Not provided'}
-
-😊 Average Mood: {avg_mood}
-
-🔥 Top Discussion Topics:
-"""
-        
-        if top_topics:
-            for i, (topic, count) in enumerate(top_topics, 1):
-                stats += f"{i}. {topic.title()} ({count} mentions)\n"
-        else:
-            stats += "No topics tracked yet.\n"
-        
-        stats += f"""
-🎭 Current Personality: {self.bot_settings['personality'].title()}
-✍️ Response Style: {self.bot_settings['response_style'].title()}
-🧠 Learning Mode: {'On' if self.bot_settings['learning_mode'] else 'Off'}
-💭 Mood Detection: {'On' if self.bot_settings['mood_detection'] else 'Off'}
-
-🔧 NLTK Features: {'Available' if NLTK_AVAILABLE else 'Not Available'}
+        metrics = self.worker_pool.metrics()
+        stats += f"""📬 Queue Depth: {metrics['queue_depth']} (max {metrics['max_queue_depth']})
+⏱️ Queue Wait: {metrics['avg_wait'] * 1000:.1f} ms avg, {metrics['max_wait'] * 1000:.1f} ms max
 """
-        
         return stats
     
+    def dump_timings(self):
+        """Save the per-stage latency percentiles to a JSON file"""
+        from tkinter import filedialog
+        
+        filename = filedialog.asksaveasfilename(
+            title="Dump Timings",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        if filename:
+            try:
+                self.engine.timings.dump(filename)
+            except OSError as e:
+                messagebox.showerror("Dump Timings", f"Failed to write timings:\n{str(e)}")
+    
     def insert_template(self, template):
         """Insert template text into input field"""
         self.user_input.delete("1.0", tk.END)
         self.user_input.insert("1.0", template)
         self.user_input.focus_set()
         self.user_input.mark_set(tk.INSERT, tk.END)
+        self.on_draft_changed()
     
     def clear_chat(self):
         """Clear chat history"""
         if messagebox.askyesno("Clear Chat", "Are you sure you want to clear the chat history?"):
-            self.chat_display.config(state=tk.NORMAL)
-            self.chat_display.delete("1.0", tk.END)
-            self.chat_display.config(state=tk.DISABLED)
+            self.display_log = deque()
+            self.display_archived = 0
+            self.turns_sent = 0
+            self.render_display_window(0)
             
-            self.conversation_history.clear()
+            self.engine.clear_history()
             self.message_count_label.config(text="Messages: 0")
             
             # Re-greet user
@@ -881,6 +863,9 @@ class AdvancedChatBot:
         if not self.conversation_history:
             messagebox.showwarning("Export", "No conversation to export!")
             return
+        if self.export_running:
+            messagebox.showwarning("Export", "An export is already in progress.")
+            return
         
         from tkinter import filedialog
         
@@ -890,41 +875,43 @@ class AdvancedChatBot:
             filetypes=[
                 ("Text files", "*.txt"),
                 ("JSON files", "*.json"),
+                ("JSON Lines", "*.jsonl"),
+                ("Compressed JSON Lines", "*.jsonl.gz"),
                 ("All files", "*.*")
             ]
         )
         
         if filename:
-            try:
-                if filename.endswith('.json'):
-                    # Export as JSON
-                    export_data = {
-                        'conversation': self.conversation_history,
-                        'user_profile': self.user_profile,
-                        'bot_settings': self.bot_settings,
-                        'export_timestamp': datetime.datetime.now().isoformat()
-                    }
-                    
-                    with open(filename, 'w', encoding='utf-8') as f:
-                        json.dump(export_data, f, indent=2, default=str)
-                else:
-                    # Export as text
-                    with open(filename, 'w', encoding='utf-8') as f:
-                        f.write("🤖 ChatBot Conversation Export\n")
-                        f.write(f"Exported: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                        f.write("=" * 50 + "\n\n")
-                        
-                        for msg in self.conversation_history:
-                            timestamp = msg['timestamp'].strftime('%H:%M:%S')
-                            f.write(f"[{timestamp}] You: {msg['user']}\n")
-                            if 'bot' in msg:
-                                f.write(f"[{timestamp}] ChatBot: {msg['bot']}\n")
-                            f.write("\n")
-                
-                messagebox.showinfo("Export", f"Conversation exported successfully!\n{filename}")
-                
-            except Exception as e:
-                messagebox.showerror("Export Error", f"Failed to export conversation:\n{str(e)}")
+            # Snapshot what the export needs; the turns themselves are
+            # streamed from the history on a background thread
+            header = {
+                'user_profile': self.engine.export_profile(),
+                'bot_settings': dict(self.bot_settings),
+                'latency': self.engine.timings.summary() if self.engine.timings is not None else None,
+                'export_timestamp': datetime.datetime.now().isoformat()
+            }
+            turns = self.conversation_history.iter_all()
+            total = self.conversation_history.total
+            
+            self.export_running = True
+            self.status_label.config(text="📄 Exporting...", fg=self.colors['warning'])
+            threading.Thread(target=self.run_export,
+                             args=(filename, turns, header, total), daemon=True).start()
+    
+    def run_export(self, filename, turns, header, total):
+        """Write an export file off the Tk thread, reporting progress"""
+        def progress(done, total):
+            self.post_ui_event('status', f"📄 Exporting... {done * 100 // max(1, total)}%", 'warning')
+        
+        try:
+            exporter_for(filename)(filename, turns, header, total, progress)
+            self.post_ui_event('status', "🟢 ChatBot Ready", 'success')
+            self.post_ui_event('call', messagebox.showinfo, "Export", f"Conversation exported successfully!\n{filename}")
+        except Exception as e:
+            self.post_ui_event('status', "⚠️ Export failed", 'error')
+            self.post_ui_event('call', messagebox.showerror, "Export Error", f"Failed to export conversation:\n{str(e)}")
+        finally:
+            self.export_running = False
     
     def on_enter(self, event):
         """Handle Enter key press"""
@@ -938,10 +925,43 @@ class AdvancedChatBot:
         """Handle Shift+Enter for newline"""
         return  # Allow default behavior (newline)
 
+    def on_knowledge_reload(self, knowledge):
+        """Swap in a reloaded knowledge base (called on the reloader thread)"""
+        self.engine.set_knowledge(knowledge)
+        self.post_ui_event('message', "System", "📚 Knowledge base reloaded.", "mood", None)
+    
+    def on_close(self):
+        """Finish queued messages and snapshot the session before exiting"""
+        if self.knowledge_reloader is not None:
+            self.knowledge_reloader.stop()
+        self.cancel_draft_timer()
+        self.worker_pool.shutdown()
+        self.engine.close()
+        self.root.destroy()
+
 def main():
     """Run the chatbot application"""
+    # Optional: CHATBOT_NLP_PROCESSES=N runs NLTK analysis in N worker processes
+    nlp_backend = None
+    processes = os.environ.get('CHATBOT_NLP_PROCESSES')
+    if processes:
+        nlp_backend = ProcessNLPBackend(workers=int(processes),
+                                        tokenizer=os.environ.get('CHATBOT_TOKENIZER', 'punkt'))
+    
+    # The session is journaled here and resumed on the next start;
+    # CHATBOT_SESSION_DIR= (empty) turns this off
+    session_dir = os.environ.get('CHATBOT_SESSION_DIR',
+                                 os.path.join(os.path.expanduser('~'), '.chatbot', 'session'))
+    
+    # CHATBOT_TIMINGS=0 turns the per-stage latency histograms off
+    timings = os.environ.get('CHATBOT_TIMINGS', '1') != '0'
+    
+    # Optional: CHATBOT_KNOWLEDGE=path loads the knowledge base from JSON files
+    knowledge_path = os.environ.get('CHATBOT_KNOWLEDGE') or None
+    
     root = tk.Tk()
-    app = AdvancedChatBot(root)
+    app = AdvancedChatBot(root, nlp_backend=nlp_backend, session_dir=session_dir, timings=timings,
+                          knowledge_path=knowledge_path)
     
     # Center window
     root.update_idletasks()
@@ -951,5 +971,7 @@ def main():
     
     root.mainloop()
 
+# Spawned worker processes re-import this module: keep its top level to
+# imports and definitions
 if __name__ == "__main__":
     main()
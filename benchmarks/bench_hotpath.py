@@ -0,0 +1,210 @@
+"""Micro-benchmarks for the message-processing hot path.
+
+Runs analyze_input, generate_response, customize_response, detect_mood,
+extract_name and update_learning headless against generated corpora:
+short, long and misspelled messages, with and without NLTK, every
+personality and response style, and knowledge bases grown with synthetic
+categories.
+Each case reports ns/op, retained allocations per op and the peak memory
+of a single call.
+
+    python benchmarks/bench_hotpath.py [--quick] [--filter analyze_input]
+    python benchmarks/bench_hotpath.py --save baseline.json
+    python benchmarks/bench_hotpath.py --compare baseline.json [--threshold 0.15]
+
+With --compare the exit status is 1 when any case is slower than the
+baseline by more than the threshold.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import corpus
+from chatbot_engine import ChatBotEngine
+from chatbot_nlp import NLPResources
+
+PERSONALITIES = ('friendly', 'professional', 'humorous', 'technical')
+STYLES = ('brief', 'detailed', 'creative')
+KB_SIZES = (0, 50, 200, 1000)
+
+
+def make_engine(nlp, cache_size=0, **settings):
+    """Return an engine with the analysis cache off so every call does the work"""
+    return ChatBotEngine(dict(settings), nlp=nlp, cache_size=cache_size)
+
+
+def load_nlp(use_nltk):
+    """Return loaded NLTK resources, unloaded ones for the basic path, or None"""
+    resources = NLPResources(download=False)
+    if use_nltk:
+        resources.load()
+        if not resources.ready:
+            return None
+    return resources
+
+
+def grow_knowledge_base(engine, size, seed=0):
+    """Add ``size`` synthetic categories after the built-in ones"""
+    rng = random.Random(seed)
+    for i in range(size):
+        words = '|'.join(f"kb{i}{rng.choice('abcdefgh')}{j}" for j in range(4))
+        engine.knowledge_base[f'synthetic_{i}'] = {
+            'patterns': [rf'\b({words})\b'],
+            'responses': [f"Synthetic answer {i}.{j}!" for j in range(3)],
+        }
+    engine.compile_patterns()
+
+
+def cases(nlp_modes, quick):
+    """Yield (name, op, inputs) for every benchmark case"""
+    counts = {'short': 200 if quick else 1000, 'long': 20 if quick else 100}
+    messages = {length: corpus.generate(count, length, seed=17) for length, count in counts.items()}
+
+    for label, nlp in nlp_modes:
+        for length, texts in messages.items():
+            engine = make_engine(nlp)
+            analyses = [engine.analyze_input(text) for text in texts]
+            yield f'analyze_input[{label},{length}]', engine.analyze_input, texts
+            if nlp.ready:
+                yield f'detect_mood[{label},{length}]', engine.detect_mood, texts
+            yield (f'update_learning[{label},{length}]',
+                   lambda pair, engine=engine: engine.update_learning(*pair), list(zip(texts, analyses)))
+
+            for personality in PERSONALITIES:
+                for style in STYLES:
+                    styled = make_engine(nlp, personality=personality, response_style=style)
+                    suffix = f'{label},{length},{personality},{style}'
+                    yield (f'generate_response[{suffix}]',
+                           lambda pair, engine=styled: engine.generate_response(*pair), list(zip(texts, analyses)))
+                    yield (f'customize_response[{suffix}]',
+                           lambda pair, engine=styled: engine.customize_response(*pair),
+                           [("That's a great question! 🤔 Let me think about that...", analysis)
+                            for analysis in analyses])
+
+    # Name extraction and pattern matching do not depend on NLTK
+    basic = nlp_modes[0][1]
+    for length, texts in messages.items():
+        yield f'extract_name[{length}]', make_engine(basic).extract_name, texts
+    # Matching cost grows with the knowledge base, so fewer messages here
+    rng = random.Random(17)
+    misspelled = [corpus.misspell(text, rng) for text in messages['short'][:50]]
+    for size in KB_SIZES:
+        engine = make_engine(basic)
+        grow_knowledge_base(engine, size)
+        yield f'analyze_input[basic,short,kb+{size}]', engine.analyze_input, messages['short'][:50]
+        yield f'analyze_input[basic,misspelled,kb+{size}]', engine.analyze_input, misspelled
+
+
+def time_case(op, inputs, repeat):
+    """Return the best ns per call over ``repeat`` passes"""
+    best = float('inf')
+    for _ in range(repeat):
+        random.seed(0)
+        start = time.perf_counter_ns()
+        for item in inputs:
+            op(item)
+        best = min(best, time.perf_counter_ns() - start)
+    return best / len(inputs)
+
+
+def memory_case(op, inputs):
+    """Return (blocks retained per call, peak bytes of one call)"""
+    random.seed(0)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    peak = 0
+    for item in inputs:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        op(item)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    return blocks / len(inputs), peak
+
+
+def run(args):
+    nlp_modes = [('basic', load_nlp(False))]
+    nltk = load_nlp(True)
+    if nltk is not None:
+        nlp_modes.append(('nltk', nltk))
+    else:
+        print("NLTK unavailable: running the basic path only", file=sys.stderr)
+
+    results = {}
+    for name, op, inputs in cases(nlp_modes, args.quick):
+        if args.filter and args.filter not in name:
+            continue
+        op(inputs[0])  # warm up
+        result = {'ns_per_op': time_case(op, inputs, args.repeat)}
+        if not args.no_memory:
+            result['blocks_per_op'], result['peak_bytes'] = memory_case(op, inputs)
+        results[name] = result
+        print(format_row(name, result), flush=True)
+    return results
+
+
+def format_row(name, result, baseline=None):
+    row = f"{name:70}{result['ns_per_op']:12,.0f} ns/op"
+    if 'blocks_per_op' in result:
+        row += f"{result['blocks_per_op']:8.1f} blocks{result['peak_bytes']:10,} B peak"
+    if baseline is not None:
+        row += f"  {result['ns_per_op'] / baseline['ns_per_op'] - 1:+7.1%}"
+    return row
+
+
+def compare(results, baseline, threshold):
+    """Print the cases past the threshold and return them"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        change = result['ns_per_op'] / baseline[name]['ns_per_op'] - 1
+        if change > threshold:
+            regressions.append(name)
+            print(f"REGRESSION {format_row(name, result, baseline[name])}")
+    missing = [name for name in baseline if name not in results]
+    print(f"{len(results)} cases, {len(regressions)} regressions past {threshold:.0%}"
+          + (f", {len(missing)} baseline cases not run" if missing else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help="smaller corpora")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', help="only cases whose name contains this")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--save', metavar='PATH', help="write the results as a baseline")
+    parser.add_argument('--compare', metavar='PATH', help="compare against a saved baseline")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="allowed slowdown before a case counts as a regression")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'python': platform.python_version(), 'quick': args.quick, 'results': results},
+                      f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('quick') != args.quick:
+            print("warning: baseline was recorded with different corpus sizes", file=sys.stderr)
+        if compare(results, baseline['results'], args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
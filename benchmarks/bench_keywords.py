@@ -0,0 +1,84 @@
+"""Compare the keyword tokenizers and the lemma cache.
+
+Checks that the fast tokenizer yields the same keywords as word_tokenize
+on a generated corpus, then times keyword extraction with each tokenizer,
+with and without the lemma cache. Needs NLTK and its data.
+
+    python benchmarks/bench_keywords.py [--messages 5000] [--check]
+
+The exit status is 1 when any message gets different keywords, so the
+check can guard fast_tokenize in CI; --check skips the timings. Known
+gaps are abbreviations punkt knows, such as "mr.", which fast_tokenize
+treats as ending a sentence; the generated corpus avoids them.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import corpus
+from chatbot_nlp import NLTK_AVAILABLE, NLPResources, extract_features
+
+
+def load(tokenizer, cached=True):
+    resources = NLPResources(download=False, tokenizer=tokenizer)
+    resources.load()
+    if not resources.ready:
+        sys.exit(f"NLTK resources unavailable: {resources.error}")
+    if not cached:
+        resources.lemmatize = resources.lemmatizer.lemmatize
+    return resources
+
+
+def keywords(resources, messages):
+    return [extract_features(resources, text, False)[0] for text in messages]
+
+
+def check_equivalence(messages):
+    """Return the messages whose keywords differ between the tokenizers"""
+    punkt, fast = load('punkt'), load('fast')
+    return [(text, a, b) for text, a, b in zip(messages, keywords(punkt, messages), keywords(fast, messages))
+            if a != b]
+
+
+def timed(resources, messages, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        keywords(resources, messages)
+        best = min(best, time.perf_counter() - start)
+    return best / len(messages) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--check', action='store_true', help="only check equivalence, skip the timings")
+    args = parser.parse_args()
+    if not NLTK_AVAILABLE:
+        sys.exit("NLTK is not installed")
+
+    failed = False
+    for length in ('short', 'long'):
+        messages = corpus.generate(args.messages if length == 'short' else args.messages // 10, length)
+        mismatches = check_equivalence(messages)
+        failed = failed or bool(mismatches)
+        print(f"{length} messages: {len(messages)}, keyword mismatches: {len(mismatches)}")
+        for text, expected, got in mismatches[:5]:
+            print(f"  {text!r}\n    word_tokenize: {expected}\n    fast:          {got}")
+        if args.check:
+            continue
+
+        baseline = None
+        for tokenizer, cached in (('punkt', False), ('punkt', True), ('fast', False), ('fast', True)):
+            took = timed(load(tokenizer, cached), messages)
+            baseline = baseline or took
+            label = f"{tokenizer}, {'lemma cache' if cached else 'no lemma cache'}"
+            print(f"  {label:24}{took:8.1f} us/msg  ({baseline / took:.1f}x)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
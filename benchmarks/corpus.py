@@ -0,0 +1,85 @@
+"""Generated chat corpora for the benchmark scripts.
+
+Messages are built from templates covering greetings, questions, requests,
+name introductions, knowledge-base topics, moods and small talk, with the
+contractions, punctuation, emoji and casing real chat input has.
+"""
+import random
+
+OPENERS = ["", "", "", "hey, ", "so ", "ok ", "well, ", "hmm... ", "lol ", "btw "]
+
+TEMPLATES = [
+    "hi there!",
+    "hello, how are you?",
+    "good morning 😊",
+    "my name is {name}",
+    "i'm {name}, nice to meet you",
+    "call me {name}.",
+    "what's the weather like today?",
+    "can you help me with {topic}?",
+    "i don't know how to get started with {topic}",
+    "i've been learning {topic} for {n} weeks and it's hard",
+    "do you like {hobby}?",
+    "tell me about {topic}",
+    "what do you think about {big}?",
+    "i'm feeling {mood} today...",
+    "i feel so {mood} because of {reason}",
+    "why can't i stop thinking about {big}?",
+    "could you please explain {topic} in simple terms?",
+    "that's {adj}! thanks a lot",
+    "i wanna talk about {hobby} -- it's my favorite",
+    "we're gonna study {topic} at the university next year",
+    "it's {weather} and {n} degrees outside, typical.",
+    "my friend {name} said {topic} isn't worth it. is that true?",
+    "i'd rather be {hobby} than doing homework (seriously)",
+    "\"{adj}\" is the only word for it",
+    "wow... that was {adj} 🤖",
+    "bye, see you later!",
+    "thanks, goodbye and take care",
+    "who are you and what are you?",
+    "i'm stuck on a problem with my {topic} code: it keeps crashing",
+    "{name}'s {hobby} club meets on tuesdays; want to join?",
+]
+
+WORDS = {
+    'name': ["alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi", "ivan", "judy"],
+    'topic': ["python", "javascript", "machine learning", "ai", "programming", "software",
+              "hardware", "physics", "history", "cooking", "math", "the course"],
+    'hobby': ["music", "movies", "books", "reading", "gaming", "sports", "art", "cooking"],
+    'big': ["philosophy", "science", "creativity", "consciousness", "the universe", "ethics"],
+    'mood': ["happy", "sad", "stressed", "excited", "anxious", "tired", "great", "angry", "joyful"],
+    'reason': ["work", "my exams", "the weather", "a long week", "good news", "my family"],
+    'adj': ["amazing", "awful", "interesting", "weird", "great", "terrible", "cool", "boring"],
+    'weather': ["sunny", "cloudy", "raining", "cold", "hot"],
+}
+
+
+def message(rng, length='short'):
+    """Return one chat message; 'long' joins several sentences"""
+    count = 1 if length == 'short' else rng.randint(8, 20)
+    sentences = []
+    for _ in range(count):
+        template = rng.choice(TEMPLATES)
+        fields = {key: rng.choice(values) for key, values in WORDS.items()}
+        fields['n'] = rng.randint(2, 40)
+        sentence = rng.choice(OPENERS) + template.format(**fields)
+        if rng.random() < 0.15:
+            sentence = sentence.capitalize()
+        sentences.append(sentence)
+    return ' '.join(sentences)
+
+
+def generate(count, length='short', seed=0):
+    """Return ``count`` messages; repeated runs with one seed are identical"""
+    rng = random.Random(seed)
+    return [message(rng, length) for _ in range(count)]
+
+
+def misspell(text, rng, rate=0.5):
+    """Drop or double one letter in some of the longer words of a message"""
+    words = text.split(' ')
+    for i, word in enumerate(words):
+        if len(word) >= 5 and word.isalpha() and rng.random() < rate:
+            j = rng.randrange(1, len(word) - 1)
+            words[i] = word[:j] + word[j + 1:] if rng.random() < 0.5 else word[:j] + word[j] + word[j:]
+    return ' '.join(words)
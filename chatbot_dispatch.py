@@ -0,0 +1,116 @@
+"""Adaptive dispatch of a message to the handler that answers it.
+
+A DispatchTable holds handlers with a fixed, unique priority. Each has a
+``match`` that only looks (no side effects, no random draws) and returns
+a token or None, and a ``respond`` that turns the winning token into the
+reply. The winner is always the matching handler with the lowest
+priority number, so replies never depend on traffic.
+
+What adapts is the order in which matchers are tried. Every handler
+counts its calls, matches and wins and samples its cost, and every
+``reorder_every`` dispatches the table sorts the handlers by mean cost
+per win. Trying stops as soon as no untried handler outranks the best
+match so far, so when the cheap handler that usually wins comes first,
+one match call decides most messages.
+
+Counters are updated without a lock; under concurrent use they are
+approximate, which only affects the order, never the winner.
+"""
+import time
+
+# Time one dispatch in this many (a power of two)
+SAMPLE_EVERY = 16
+
+
+class Handler:
+    """One dispatch table entry and its counters"""
+
+    __slots__ = ('name', 'priority', 'match', 'respond', 'calls', 'hits', 'wins', 'timed', 'total_ns')
+
+    def __init__(self, name, priority, match, respond):
+        self.name = name
+        self.priority = priority
+        self.match = match
+        self.respond = respond
+        self.calls = 0
+        self.hits = 0
+        self.wins = 0
+        self.timed = 0  # sampled calls
+        self.total_ns = 0
+
+    def cost_per_win(self, dispatches):
+        """Mean cost in ns divided by the (smoothed) chance of winning"""
+        mean = self.total_ns / self.timed if self.timed else 0.0
+        return mean * (dispatches + 2) / (self.wins + 1)
+
+
+class DispatchTable:
+    """Handlers tried cheapest-per-win first; the lowest priority match wins"""
+
+    def __init__(self, reorder_every=256):
+        self.reorder_every = reorder_every
+        self.handlers = []
+        self.dispatches = 0
+        # (handlers in trial order, lowest priority among the handlers after each)
+        self.plan = ((), ())
+
+    def add(self, name, priority, match, respond):
+        if any(handler.priority == priority for handler in self.handlers):
+            raise ValueError(f"Priority {priority} is already taken")
+        self.handlers.append(Handler(name, priority, match, respond))
+        self.reorder(sorted(self.handlers, key=lambda handler: handler.priority))
+        return self
+
+    def reorder(self, order=None):
+        """Set the trial order, by default cheapest per win first"""
+        if order is None:
+            dispatches = self.dispatches
+            order = sorted(self.handlers, key=lambda handler: (handler.cost_per_win(dispatches), handler.priority))
+        bounds = []
+        lowest = float('inf')
+        for handler in reversed(order):
+            bounds.append(lowest)
+            lowest = min(lowest, handler.priority)
+        self.plan = (tuple(order), tuple(reversed(bounds)))
+
+    def dispatch(self, *args):
+        """Return respond(*args, token) of the winning handler, or None if none matched"""
+        self.dispatches += 1
+        timed = not self.dispatches & (SAMPLE_EVERY - 1)
+        if not self.dispatches % self.reorder_every:
+            self.reorder()
+
+        order, bounds = self.plan
+        winner = token = None
+        for handler, bound in zip(order, bounds):
+            if winner is None or handler.priority < winner.priority:
+                handler.calls += 1
+                if timed:
+                    start = time.perf_counter_ns()
+                    result = handler.match(*args)
+                    handler.total_ns += time.perf_counter_ns() - start
+                    handler.timed += 1
+                else:
+                    result = handler.match(*args)
+                if result is not None:
+                    handler.hits += 1
+                    winner, token = handler, result
+            # Nothing left to try can outrank the current match
+            if winner is not None and winner.priority < bound:
+                break
+
+        if winner is None:
+            return None
+        winner.wins += 1
+        return winner.respond(*args, token)
+
+    def stats(self):
+        """Return [{name, priority, calls, hits, wins, mean_ns}] in trial order"""
+        return [{
+            'name': handler.name,
+            'priority': handler.priority,
+            'calls': handler.calls,
+            'hits': handler.hits,
+            'wins': handler.wins,
+            'mean_ns': handler.total_ns / handler.timed if handler.timed else 0.0,
+        } for handler in self.plan[0]]
@@ -0,0 +1,923 @@
+"""Headless conversation engine for the Advanced AI ChatBot.
+
+Everything needed to analyze a message and produce a reply lives here, with
+no dependency on tkinter, so the bot can run on a server or be profiled on
+its own. ``AdvancedChatBot`` in ChatBot.py is a thin view over this engine.
+"""
+import re
+import random
+import datetime
+import threading
+import time
+from collections import OrderedDict
+
+from chatbot_dispatch import DispatchTable
+from chatbot_fuzzy import NUMPY_AVAILABLE, FuzzyIntentMatcher
+from chatbot_nlp import NLP_LOADING, NLP_PENDING, extract_features, extract_features_batch, get_nlp_resources
+from chatbot_responses import NAME_SLOT, ResponseVariants, mood_of
+from chatbot_retrieval import RetrievalIndex
+from chatbot_storage import MoodEntry, MoodHistory, Sentiment, TopicCounter, Turn, TurnHistory
+
+# Substring triggers used for intent fallbacks and name capture
+QUESTION_WORDS = ['?', 'what', 'how', 'why', 'when', 'where']
+REQUEST_WORDS = ['please', 'can you', 'could you', 'help']
+NAME_TRIGGERS = ['my name is', 'i am', "i'm"]
+NAME_PREFIXES = ['my name is ', 'i am ', "i'm ", 'call me ']
+
+NAME_WORD = re.compile(r'\w+')
+
+# Intent fallbacks; NAME_SLOT takes "<name>, " once the user's name is known
+QUESTION_RESPONSES = [
+    f"{NAME_SLOT}That's a great question! 🤔 While I don't have specific data on that, I'd love to explore the topic with you.",
+    f"{NAME_SLOT}Interesting question! 💭 What specifically about this topic would you like to discuss?",
+    f"{NAME_SLOT}I appreciate your curiosity! 🌟 Let me think about that..."
+]
+REQUEST_RESPONSES = [
+    f"{NAME_SLOT}I'd be happy to help! 🤝 Could you provide more details about what you need?",
+    f"{NAME_SLOT}Of course! 💪 Tell me more about what assistance you're looking for.",
+    f"{NAME_SLOT}I'm here to help! 🎯 What specifically can I do for you?"
+]
+
+
+class KeywordIndex:
+    """Aho-Corasick automaton reporting every keyword hit in one pass"""
+    
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.built = True
+    
+    def add(self, keyword, group):
+        """Register a keyword under a group name"""
+        state = 0
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        if (keyword, group) not in self.output[state]:
+            self.output[state].append((keyword, group))
+        self.built = False
+    
+    def build(self):
+        """Compute failure links breadth-first"""
+        goto, fail, output = self.goto, self.fail, self.output
+        queue = list(goto[0].values())
+        for state in queue:
+            fail[state] = 0
+        for state in queue:
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                output[next_state] = output[next_state] + output[fail[next_state]]
+        self.built = True
+    
+    def scan(self, text):
+        """Return {group: [(start, keyword), ...]} in text order"""
+        if not self.built:
+            self.build()
+        
+        goto, fail, output = self.goto, self.fail, self.output
+        hits = {}
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword, group in output[state]:
+                hits.setdefault(group, []).append((position - len(keyword) + 1, keyword))
+        return hits
+
+
+class Knowledge:
+    """A knowledge base together with the indexes compiled from it
+
+    Engines swap whole Knowledge objects, so one reply never mixes two
+    versions of the knowledge base.
+    """
+    
+    def __init__(self, knowledge_base, advanced_topics, source_hash=None):
+        self.knowledge_base = knowledge_base
+        self.advanced_topics = advanced_topics
+        # Hash of the files this was loaded from, if any
+        self.source_hash = source_hash
+        self.retrieval = RetrievalIndex(knowledge_base, advanced_topics)
+        # Trigram matching for messages no keyword matches exactly
+        self.fuzzy = FuzzyIntentMatcher(knowledge_base) if NUMPY_AVAILABLE else None
+        
+        # Every substring trigger in one automaton
+        self.keyword_index = KeywordIndex()
+        self.topic_order = {}
+        for topic in advanced_topics:
+            self.topic_order[topic] = len(self.topic_order)
+            self.keyword_index.add(topic, 'topic')
+        for group, words in (('question', QUESTION_WORDS), ('request', REQUEST_WORDS),
+                             ('name_trigger', NAME_TRIGGERS), ('name_prefix', NAME_PREFIXES)):
+            for word in words:
+                self.keyword_index.add(word, group)
+        self.keyword_index.build()
+        
+        # (personality, style) -> ResponseVariants, filled as they are used
+        self.variants = {}
+    
+    def __getstate__(self):
+        return dict(self.__dict__, variants={})
+    
+    def response_variants(self, personality, style):
+        """Return the rendered-response table for a personality and style"""
+        variants = self.variants.get((personality, style))
+        if variants is None:
+            variants = self.variants[(personality, style)] = ResponseVariants(personality, style)
+        return variants
+
+
+class AnalysisCache:
+    """Thread-safe LRU cache of analysis results with an optional TTL"""
+    
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, count=True):
+        """Return the cached value for key, or None
+
+        With count=False the lookup is left out of the hit and miss counters.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += count
+                    return value
+                del self._entries[key]
+            self.misses += count
+            return None
+    
+    def put(self, key, value):
+        """Store value, evicting the least recently used entries"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """Return size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+def normalize_text(text):
+    """Collapse whitespace so equivalent messages share a cache entry"""
+    return ' '.join(text.split())
+
+
+def reply_dispatch_table():
+    """Return the reply handlers of an engine, in priority order
+
+    A knowledge-base category beats an advanced topic, which beats
+    capturing the user's name, then the question and request fallbacks.
+    """
+    table = DispatchTable()
+    table.add('category', 0, ChatBotEngine.match_category, ChatBotEngine.reply_category)
+    table.add('topic', 1, ChatBotEngine.match_topic, ChatBotEngine.reply_topic)
+    table.add('name', 2, ChatBotEngine.match_name, ChatBotEngine.reply_name)
+    table.add('question', 3, ChatBotEngine.match_question, ChatBotEngine.reply_fallback)
+    table.add('request', 4, ChatBotEngine.match_request, ChatBotEngine.reply_fallback)
+    return table
+
+
+class ChatBotEngine:
+    """GUI-free chatbot holding its own session state"""
+    
+    def __init__(self, bot_settings=None, nlp=None, cache_size=1024, cache_ttl=None,
+                 nlp_backend=None, offload_threshold=400, shared=None,
+                 history_limit=500, spill_dir=None, journal=None, timings=None,
+                 knowledge=None):
+        # Chat state; older turns spill to disk past history_limit
+        self.conversation_history = TurnHistory(history_limit, spill_dir)
+        # Optional SessionJournal recording turns and profile updates
+        self.journal = journal
+        # Optional StageTimings; None skips every timing call
+        self.timings = timings
+        # Source of every random choice in a reply; replay gives each
+        # message its own seeded random.Random
+        self.rng = random
+        self.user_profile = {
+            'name': None,
+            'preferences': {},
+            'mood_history': MoodHistory(maxlen=50),  # Keep only last 50 mood entries
+            'topics_discussed': TopicCounter(k=5)
+        }
+        
+        # Bot personality settings
+        self.bot_settings = {
+            'personality': 'friendly',  # friendly, professional, humorous, technical
+            'response_style': 'detailed',  # brief, detailed, creative
+            'learning_mode': True,
+            'mood_detection': True
+        }
+        if bot_settings:
+            self.bot_settings.update(bot_settings)
+        
+        if shared is not None:
+            # Another session's resources, knowledge and analysis cache
+            # (analysis depends only on the text and the settings in its key)
+            self.nlp = shared.nlp
+            self.nlp_backend = shared.nlp_backend
+            self.offload_threshold = shared.offload_threshold
+            self.analysis_cache = shared.analysis_cache
+            self.timings = shared.timings
+            self.replies = shared.replies
+            # Knowledge lives on the first engine, so a swap reaches every session
+            self.knowledge_owner = shared.knowledge_owner
+            return
+        
+        # NLTK components warm up in the background; the basic path is
+        # used until they are ready
+        self.nlp = nlp or get_nlp_resources()
+        
+        # Optional ProcessNLPBackend for batches and long inputs
+        self.nlp_backend = nlp_backend
+        self.offload_threshold = offload_threshold
+        
+        # Repeated messages skip tokenizing, lemmatizing and sentiment
+        self.analysis_cache = AnalysisCache(cache_size, cache_ttl)
+        
+        # How a reply is chosen; its trial order adapts to the traffic
+        self.replies = reply_dispatch_table()
+        
+        # A compiled Knowledge (e.g. from chatbot_knowledge), or the built-in one
+        self.knowledge_owner = self
+        if knowledge is not None:
+            self.set_knowledge(knowledge)
+        else:
+            self.setup_knowledge_base()
+    
+    @property
+    def knowledge(self):
+        """The Knowledge currently in use"""
+        return self.knowledge_owner.current_knowledge
+    
+    @property
+    def knowledge_base(self):
+        return self.knowledge.knowledge_base
+    
+    @property
+    def advanced_topics(self):
+        return self.knowledge.advanced_topics
+    
+    def set_knowledge(self, knowledge):
+        """Swap in a compiled Knowledge for this engine and every session sharing it"""
+        self.knowledge_owner.current_knowledge = knowledge
+        self.analysis_cache.clear()
+    
+    def new_session(self, bot_settings=None):
+        """Create an engine with fresh session state sharing this one's knowledge"""
+        history = self.conversation_history
+        return ChatBotEngine(bot_settings, shared=self,
+                             history_limit=history.limit, spill_dir=history.spill_dir)
+        
+    def setup_knowledge_base(self):
+        """Initialize the bot's knowledge base"""
+        knowledge_base = {
+            # Greetings and basic interactions
+            'greetings': {
+                'patterns': [r'\b(hi|hello|hey|greetings|good morning|good afternoon|good evening)\b'],
+                'responses': [
+                    "Hello! 👋 I'm your AI assistant. How can I help you today?",
+                    "Hi there! 😊 What would you like to chat about?",
+                    "Greetings! I'm here to help. What's on your mind?",
+                    "Hey! 🤖 Ready for an interesting conversation?"
+                ]
+            },
+            
+            # Farewells
+            'farewells': {
+                'patterns': [r'\b(bye|goodbye|see you|farewell|take care|exit|quit)\b'],
+                'responses': [
+                    "Goodbye! 👋 It was great chatting with you!",
+                    "See you later! 😊 Have a wonderful day!",
+                    "Take care! Feel free to come back anytime.",
+                    "Farewell! 🤖 Hope our conversation was helpful!"
+                ]
+            },
+            
+            # Questions about the bot
+            'bot_info': {
+                'patterns': [r'\b(who are you|what are you|your name|about you|tell me about yourself)\b'],
+                'responses': [
+                    "I'm an advanced AI chatbot! 🤖 I can help with questions, have conversations, and even detect your mood!",
+                    "I'm your friendly AI assistant, designed to chat, help, and learn from our conversations!",
+                    "I'm an intelligent chatbot with personality! I can discuss various topics and adapt to your communication style."
+                ]
+            },
+            
+            # How are you
+            'how_are_you': {
+                'patterns': [r'\b(how are you|how do you feel|what\'s up|how\'s it going)\b'],
+                'responses': [
+                    "I'm doing great! 😊 My circuits are buzzing with excitement to chat with you!",
+                    "I'm fantastic! 🌟 Every conversation energizes my algorithms!",
+                    "I'm wonderful! Ready to tackle any topic you throw at me! 💪"
+                ]
+            },
+            
+            # Technology topics
+            'technology': {
+                'patterns': [r'\b(programming|coding|python|javascript|ai|artificial intelligence|machine learning|computer|software|hardware|tech)\b'],
+                'responses': [
+                    "Technology is fascinating! 💻 I love discussing programming, AI, and the latest tech trends. What specific area interests you?",
+                    "Oh, a fellow tech enthusiast! 🚀 From Python to AI, there's so much to explore. What would you like to know?",
+                    "Technology is evolving so rapidly! Whether it's coding, AI, or hardware, I'm here to discuss it all! 🔧"
+                ]
+            },
+            
+            # Weather
+            'weather': {
+                'patterns': [r'\b(weather|rain|sunny|cloudy|temperature|forecast|climate)\b'],
+                'responses': [
+                    "I wish I could check the weather for you! 🌤️ Try asking a weather service or checking your local forecast.",
+                    "Weather affects our mood so much! ☀️🌧️ How's the weather treating you today?",
+                    "I can't access real-time weather data, but I'd love to chat about how weather impacts our daily lives! 🌈"
+                ]
+            },
+            
+            # Hobbies and interests
+            'hobbies': {
+                'patterns': [r'\b(hobby|hobbies|interests|music|movies|books|reading|gaming|sports|art|cooking)\b'],
+                'responses': [
+                    "Hobbies make life so much richer! 🎨 I'd love to hear about your interests. What do you enjoy doing in your free time?",
+                    "That sounds interesting! 🎯 Hobbies are a great way to express creativity and relax. Tell me more!",
+                    "I find human hobbies fascinating! 🎪 From music to sports to art - there's so much diversity in what people enjoy!"
+                ]
+            },
+            
+            # Emotions and mood
+            'emotions': {
+                'patterns': [r'\b(sad|happy|angry|frustrated|excited|worried|anxious|depressed|joyful|stressed)\b'],
+                'responses': [
+                    "I understand emotions can be complex. 💙 Would you like to talk about what's affecting your mood?",
+                    "Feelings are important and valid. 🤗 I'm here to listen if you want to share what's on your mind.",
+                    "Emotions are part of what makes us human (and interesting to an AI like me!). How are you feeling right now?"
+                ]
+            },
+            
+            # Help and assistance
+            'help': {
+                'patterns': [r'\b(help|assist|support|confused|don\'t know|stuck|problem)\b'],
+                'responses': [
+                    "I'm here to help! 🆘 What specific problem or question can I assist you with?",
+                    "No worries! 🤝 Everyone needs help sometimes. Tell me what's troubling you and let's work through it together.",
+                    "That's what I'm here for! 💡 Describe your issue and I'll do my best to provide useful guidance."
+                ]
+            },
+            
+            # Learning and education
+            'learning': {
+                'patterns': [r'\b(learn|study|education|school|university|course|tutorial|knowledge|teach)\b'],
+                'responses': [
+                    "Learning is amazing! 📚 I love helping people discover new knowledge. What subject interests you?",
+                    "Education opens so many doors! 🎓 Whether it's formal study or self-learning, I'm here to support your journey.",
+                    "Knowledge is power! 💪 I can help explain concepts, suggest resources, or just discuss learning strategies."
+                ]
+            },
+            
+            # Default responses for unmatched input
+            'default': [
+                "That's interesting! 🤔 Can you tell me more about that?",
+                "I'm not sure I fully understand, but I'd love to learn more! 💭",
+                "Hmm, that's a new one for me! 🧠 Could you elaborate?",
+                "I find that topic intriguing! 🌟 What's your perspective on it?",
+                "Tell me more! 📖 I'm always eager to learn from our conversations."
+            ]
+        }
+        
+        # Advanced conversation topics
+        advanced_topics = {
+            'philosophy': [
+                "Philosophy makes me think about consciousness and existence! 🤔 What philosophical questions fascinate you?",
+                "The big questions of life! 💭 From ethics to metaphysics, philosophy explores the deepest aspects of reality.",
+                "I love philosophical discussions! 🧠 They challenge us to think beyond the obvious."
+            ],
+            'science': [
+                "Science is the quest to understand our universe! 🔬 From quantum physics to biology, what area captivates you?",
+                "The scientific method has given us incredible insights! 🌌 What scientific discoveries amaze you most?",
+                "Science fiction often becomes science fact! 🚀 I'm fascinated by how human curiosity drives discovery."
+            ],
+            'creativity': [
+                "Creativity is one of humanity's greatest gifts! 🎨 How do you express your creative side?",
+                "Art, music, writing - creativity takes so many forms! 🌈 What inspires your imagination?",
+                "I'm amazed by human creativity! 💫 Even as an AI, I try to be creative in my responses."
+            ]
+        }
+        
+        self.set_knowledge(Knowledge(knowledge_base, advanced_topics))
+    
+    def compile_patterns(self):
+        """Recompile the indexes after the knowledge base dicts were edited in place"""
+        self.set_knowledge(Knowledge(self.knowledge_base, self.advanced_topics))
+    
+    def respond(self, user_text):
+        """Process one user message, record the turn and return the reply"""
+        # Analyze user input (sentiment, keywords, entities and intent in one pass)
+        analysis = self.analyze_input(user_text)
+        return self.complete_turn(user_text, analysis)
+    
+    def complete_turn(self, user_text, analysis):
+        """Record a turn for an analyzed message and return the reply"""
+        # Store conversation
+        turn = Turn(user_text, time.time(), Sentiment.from_scores(analysis['sentiment']))
+        self.conversation_history.append(turn)
+        
+        # Generate response
+        timings = self.timings
+        if timings is not None:
+            start = timings.now()
+        response = self.generate_response(user_text, analysis)
+        if timings is not None:
+            start = timings.since('generate', start)
+        
+        # Store bot response
+        turn.bot = response
+        if self.journal is not None:
+            self.journal.append('turn', turn.to_row())
+        
+        # Update learning
+        if self.bot_settings['learning_mode']:
+            self.update_learning(user_text, analysis)
+            if timings is not None:
+                timings.since('learn', start)
+        
+        if self.journal is not None and self.journal.snapshot_due:
+            self.journal.snapshot(self.snapshot_state())
+        
+        return response
+    
+    def respond_batch(self, texts):
+        """Process many user messages in order and return their replies"""
+        texts = list(texts)
+        complete_turn = self.complete_turn
+        return [complete_turn(text, analysis)
+                for text, analysis in zip(texts, self.analyze_batch(texts))]
+    
+    def nlp_mode(self):
+        """Return which NLP path analysis will take: 'process', 'local' or None"""
+        if self.nlp_backend is not None and self.nlp_backend.ready:
+            return 'process'
+        if self.nlp.ready:
+            return 'local'
+        return None
+    
+    def analyze_input(self, text, speculative=False):
+        """Analyze user input for patterns and intent, using the cache
+
+        A speculative analysis, e.g. of a draft that may never be sent,
+        fills the cache without counting as a lookup or adding stage timings.
+        """
+        text = normalize_text(text)
+        mode = self.nlp_mode()
+        knowledge = self.knowledge
+        key = (text, mode is not None, self.bot_settings['mood_detection'], knowledge)
+        analysis = self.analysis_cache.get(key, count=not speculative)
+        if analysis is None:
+            features = None
+            if mode == 'process' and (len(text) >= self.offload_threshold or not self.nlp.ready):
+                # Long input: score it in a worker process, off the GIL
+                features = self.nlp_backend.extract([text], self.bot_settings['mood_detection'])[0]
+            analysis = self.compute_analysis(text, features, knowledge, timed=not speculative)
+            self.analysis_cache.put(key, analysis)
+        # Callers get their own dict; the cached entry stays untouched
+        return dict(analysis)
+    
+    def analyze_batch(self, texts):
+        """Analyze many messages, batching the NLP work of cache misses
+
+        Misses go to the process backend when it is ready, otherwise their
+        sentiment is scored locally in one vectorized pass.
+        """
+        mode = self.nlp_mode()
+        if mode is None:
+            return [self.analyze_input(text) for text in texts]
+        
+        mood_detection = self.bot_settings['mood_detection']
+        knowledge = self.knowledge
+        normalized = [normalize_text(text) for text in texts]
+        analyses = [self.analysis_cache.get((text, True, mood_detection, knowledge)) for text in normalized]
+        
+        # Unique cache misses are analyzed together
+        missing = list(dict.fromkeys(text for text, analysis in zip(normalized, analyses) if analysis is None))
+        computed = {}
+        if missing:
+            if mode == 'process':
+                features = self.nlp_backend.extract(missing, mood_detection)
+            else:
+                features = extract_features_batch(self.nlp, missing, mood_detection)
+            for text, feature in zip(missing, features):
+                computed[text] = self.compute_analysis(text, feature, knowledge)
+                self.analysis_cache.put((text, True, mood_detection, knowledge), computed[text])
+        
+        return [dict(analysis if analysis is not None else computed[text])
+                for text, analysis in zip(normalized, analyses)]
+    
+    def compute_analysis(self, text, features=None, knowledge=None, timed=True):
+        """Run the full analysis pipeline on already normalized text
+
+        ``features`` is a precomputed (keywords, sentiment) pair, e.g. from
+        a worker process; without it the local NLTK resources are used.
+        With timed=False no stage timings are recorded.
+        """
+        knowledge = knowledge or self.knowledge
+        analysis = {
+            'categories': [],
+            'keywords': [],
+            'sentiment': None,
+            'intent': 'unknown',
+            'entities': [],
+            'keyword_hits': None
+        }
+        
+        text_lower = text.lower()
+        timings = self.timings if timed else None
+        if timings is not None:
+            start = timings.now()
+        
+        # Look up knowledge base keywords, best matching category first
+        categories = knowledge.retrieval.match_categories(text_lower)
+        if not categories and knowledge.fuzzy is not None:
+            # Nothing matched exactly; try misspellings of the keywords
+            categories = knowledge.fuzzy.match(text_lower)
+        analysis['categories'] = categories
+        if not categories:
+            # Question, request, topic and name triggers only matter without a category
+            analysis['keyword_hits'] = knowledge.keyword_index.scan(text_lower)
+        if timings is not None:
+            start = timings.since('match', start)
+        
+        # Extract keywords and sentiment (once the NLTK resources are loaded)
+        if features is None and self.nlp.ready:
+            if timings is None:
+                features = extract_features(self.nlp, text, self.bot_settings['mood_detection'])
+            else:
+                # Timed separately: keywords first, then sentiment
+                keywords = extract_features(self.nlp, text, False)[0]
+                start = timings.since('tokenize', start)
+                sentiment = self.detect_mood(text) if self.bot_settings['mood_detection'] else None
+                timings.since('mood', start)
+                features = keywords, sentiment
+        if features is not None:
+            analysis['keywords'], analysis['sentiment'] = features
+        
+        # Simple entity detection
+        entities = []
+        # Detect names (capitalized words that aren't at sentence start)
+        words = text.split()
+        for i, word in enumerate(words):
+            if word[0].isupper() and i > 0 and words[i-1][-1] not in '.!?':
+                entities.append(word)
+        analysis['entities'] = entities
+        
+        # Determine intent
+        if categories:
+            analysis['intent'] = categories[0]
+        elif 'question' in analysis['keyword_hits']:
+            analysis['intent'] = 'question'
+        elif 'request' in analysis['keyword_hits']:
+            analysis['intent'] = 'request'
+        
+        return analysis
+    
+    def generate_response(self, user_text, analysis):
+        """Generate appropriate response based on analysis"""
+        knowledge = self.knowledge
+        # Handlers see the text the analysis scanned, so hit offsets line up
+        text = normalize_text(user_text)
+        response = self.replies.dispatch(self, text, analysis, knowledge)
+        if response is None:
+            # Use default responses
+            response = self.reply_fallback(text, analysis, knowledge, knowledge.knowledge_base['default'])
+        return response
+    
+    def keyword_hits(self, user_text, analysis, knowledge):
+        """Return the keyword scan of a message, scanning on first use"""
+        hits = analysis.get('keyword_hits')
+        if hits is None:
+            hits = analysis['keyword_hits'] = knowledge.keyword_index.scan(user_text.lower())
+        return hits
+    
+    # Reply handlers: match_* only look, reply_* build the reply of the winner
+    
+    def match_category(self, user_text, analysis, knowledge):
+        categories = analysis['categories']
+        if categories and categories[0] in knowledge.retrieval.order:
+            return categories[0]
+        return None
+    
+    def reply_category(self, user_text, analysis, knowledge, category):
+        base_response = knowledge.retrieval.category_response(category, user_text.lower(), self.rng)
+        
+        # Customize based on personality
+        return self.customize_response(base_response, analysis)
+    
+    def match_topic(self, user_text, analysis, knowledge):
+        # Hits may predate a knowledge base reload
+        hits = self.keyword_hits(user_text, analysis, knowledge)
+        topics = [keyword for _, keyword in hits.get('topic', ()) if keyword in knowledge.topic_order]
+        if topics:
+            return min(topics, key=knowledge.topic_order.get)
+        return None
+    
+    def reply_topic(self, user_text, analysis, knowledge, topic):
+        base_response = knowledge.retrieval.topic_response(topic, user_text.lower(), self.rng)
+        return self.customize_response(base_response, analysis)
+    
+    def match_name(self, user_text, analysis, knowledge):
+        if self.user_profile['name']:
+            return None
+        hits = self.keyword_hits(user_text, analysis, knowledge)
+        if 'name_trigger' not in hits:
+            return None
+        return self.extract_name(user_text, hits)
+    
+    def reply_name(self, user_text, analysis, knowledge, name):
+        # Store the user's name
+        self.user_profile['name'] = name
+        if self.journal is not None:
+            self.journal.append('name', name)
+        return f"Nice to meet you, {name}! 😊 I'll remember your name for our future conversations."
+    
+    def match_question(self, user_text, analysis, knowledge):
+        return QUESTION_RESPONSES if analysis['intent'] == 'question' else None
+    
+    def match_request(self, user_text, analysis, knowledge):
+        return REQUEST_RESPONSES if analysis['intent'] == 'request' else None
+    
+    def reply_fallback(self, user_text, analysis, knowledge, responses):
+        # Use name if available
+        name_prefix = f"{self.user_profile['name']}, " if self.user_profile['name'] else ""
+        base_response = self.rng.choice(responses)
+        return self.customize_response(base_response, analysis, name_prefix)
+    
+    def customize_response(self, base_response, analysis, name_prefix=""):
+        """Customize response based on personality and mood
+
+        Renders come from the knowledge base's table for the current
+        personality and style; NAME_SLOT in base_response becomes name_prefix.
+        """
+        settings = self.bot_settings
+        mood = mood_of(analysis.get('sentiment')) if settings['mood_detection'] else None
+        knowledge = self.knowledge_owner.current_knowledge
+        key = (settings['personality'], settings['response_style'])
+        variants = knowledge.variants.get(key) or knowledge.response_variants(*key)
+        return variants.render(base_response, mood, name_prefix, self.rng)
+    
+    def detect_mood(self, text):
+        """Detect mood using sentiment analysis"""
+        if not self.nlp.ready:
+            return None
+            
+        try:
+            scores = self.nlp.sentiment_analyzer.polarity_scores(text)
+            return scores
+        except Exception:
+            return None
+    
+    def detect_moods(self, texts):
+        """Detect the mood of many texts in one vectorized pass"""
+        texts = list(texts)
+        if not self.nlp.ready:
+            return [None] * len(texts)
+        try:
+            return self.nlp.batch_sentiment.polarity_scores(texts)
+        except Exception:
+            return [None] * len(texts)
+    
+    def extract_name(self, text, hits=None):
+        """Extract user name from text
+
+        ``hits`` must come from scanning the normalized text, as the
+        analysis does; offsets into the raw text would be off.
+        """
+        text_lower = normalize_text(text).lower()
+        if hits is None:
+            hits = self.knowledge.keyword_index.scan(text_lower)
+        
+        # Prefixes are tried in priority order, leftmost occurrence first
+        prefix_hits = hits.get('name_prefix', [])
+        for prefix in NAME_PREFIXES:
+            for start, keyword in prefix_hits:
+                if keyword != prefix:
+                    continue
+                match = NAME_WORD.match(text_lower, start + len(prefix))
+                if match:
+                    return match.group(0).title()
+        return None
+    
+    def update_learning(self, user_text, analysis):
+        """Update bot's learning from conversation"""
+        keywords = analysis.get('keywords', [])
+        mood = None
+        if analysis.get('sentiment'):
+            mood = MoodEntry(time.time(), Sentiment.from_scores(analysis['sentiment']))
+        self.apply_learning(keywords, mood)
+        
+        if self.journal is not None:
+            self.journal.append('learn', [keywords, mood.to_row() if mood is not None else None])
+    
+    def apply_learning(self, keywords, mood=None):
+        """Add keywords and a MoodEntry to the user profile"""
+        # Track topics discussed
+        add_topic = self.user_profile['topics_discussed'].add
+        for keyword in keywords:
+            add_topic(keyword)
+        
+        # Store mood history
+        if mood is not None:
+            # The deque drops the oldest entry past its limit
+            self.user_profile['mood_history'].append(mood)
+    
+    def generate_statistics(self):
+        """Generate conversation statistics"""
+        total_messages = self.conversation_history.total
+        
+        if total_messages == 0:
+            return "📊 No conversation data yet!\n\nStart chatting to see statistics."
+        
+        # Calculate statistics
+        # Every turn starts with a user message
+        user_messages = total_messages
+        
+        # Most discussed topics (kept ranked as they are counted)
+        top_topics = self.user_profile['topics_discussed'].top(5)
+        
+        # Average mood (if available)
+        avg_mood = "N/A"
+        avg_score = self.user_profile['mood_history'].average
+        if avg_score is not None:
+            if avg_score > 0.1:
+                avg_mood = "😊 Positive"
+            elif avg_score < -0.1:
+                avg_mood = "😔 Negative"
+            else:
+                avg_mood = "😐 Neutral"
+        
+        # Session duration
+        if self.conversation_history:
+            session_start = datetime.datetime.fromtimestamp(self.conversation_history.first_timestamp)
+            session_duration = datetime.datetime.now() - session_start
+            duration_str = str(session_duration).split('.')[0]  # Remove microseconds
+        else:
+            duration_str = "0:00:00"
+        
+        stats = f"""📊 Conversation Statistics
+
+💬 Total Messages: {total_messages}
+👤 Your Messages: {user_messages}
+🤖 Bot Responses: {total_messages - user_messages}
+
+⏱️ Session Duration: {duration_str}
+👤 Your Name: {self.user_profile['name'] or 'Not provided'}
+
+😊 Average Mood: {avg_mood}
+
+🔥 Top Discussion Topics:
+"""
+        
+        if top_topics:
+            for i, (topic, count) in enumerate(top_topics, 1):
+                stats += f"{i}. {topic.title()} ({count} mentions)\n"
+        else:
+            stats += "No topics tracked yet.\n"
+        
+        cache = self.analysis_cache.stats()
+        stats += f"""
+🎭 Current Personality: {self.bot_settings['personality'].title()}
+✍️ Response Style: {self.bot_settings['response_style'].title()}
+🧠 Learning Mode: {'On' if self.bot_settings['learning_mode'] else 'Off'}
+💭 Mood Detection: {'On' if self.bot_settings['mood_detection'] else 'Off'}
+
+🔧 NLTK Features: {self.nlp_status()}
+⚡ Analysis Cache: {cache['hits']} hits / {cache['misses']} misses ({cache['hit_rate']:.0%})
+🔀 Reply Handlers: {' → '.join(f"{handler['name']} ({handler['wins']})" for handler in self.replies.stats())}
+"""
+        
+        if self.timings is not None:
+            lines = self.timings.format()
+            if lines:
+                stats += "\n⏱️ Stage Latency          p50     p95     p99\n" + "\n".join(lines) + "\n"
+        
+        return stats
+
+    def nlp_status(self):
+        """Describe the NLP resource state for display"""
+        if self.nlp.ready:
+            return 'Available'
+        if self.nlp.state in (NLP_PENDING, NLP_LOADING):
+            return 'Loading...'
+        return 'Not Available'
+    
+    def export_profile(self):
+        """Return the user profile in JSON-friendly form"""
+        profile = self.user_profile
+        return {
+            'name': profile['name'],
+            'preferences': profile['preferences'],
+            'mood_history': [entry.to_dict() for entry in profile['mood_history']],
+            'topics_discussed': dict(profile['topics_discussed'])
+        }
+    
+    def snapshot_state(self):
+        """Return the session state as JSON-friendly data for a journal snapshot
+
+        Only the turns still held in memory are kept; the session totals
+        are carried over so statistics continue where they left off. The
+        result shares nothing mutable with the session, so the journal can
+        write it on its own thread.
+        """
+        history = self.conversation_history
+        turns = history.recent()
+        if history.limit is not None:
+            turns = turns[-history.limit:]
+        profile = self.user_profile
+        return {
+            'turns': [turn.to_row() for turn in turns],
+            'total': history.total,
+            'first_timestamp': history.first_timestamp,
+            'name': profile['name'],
+            'preferences': dict(profile['preferences']),
+            'mood_history': [entry.to_row() for entry in profile['mood_history']],
+            'topics_discussed': dict(profile['topics_discussed'])
+        }
+    
+    def load_state(self, state):
+        """Replace the session state with a snapshot_state() result"""
+        self.conversation_history.restore([Turn.from_row(row) for row in state['turns']],
+                                          state['total'], state['first_timestamp'])
+        profile = self.user_profile
+        profile['name'] = state['name']
+        profile['preferences'] = state['preferences']
+        profile['mood_history'].clear()
+        profile['mood_history'].extend(MoodEntry.from_row(row) for row in state['mood_history'])
+        profile['topics_discussed'] = TopicCounter(state['topics_discussed'], k=5)
+    
+    def apply_journal_record(self, kind, payload):
+        """Replay one journal record on top of the current state"""
+        if kind == 'turn':
+            self.conversation_history.append(Turn.from_row(payload))
+        elif kind == 'learn':
+            keywords, mood = payload
+            self.apply_learning(keywords, MoodEntry.from_row(mood) if mood is not None else None)
+        elif kind == 'name':
+            self.user_profile['name'] = payload
+        elif kind == 'clear':
+            self.conversation_history.clear()
+    
+    def resume(self):
+        """Restore the last session from the journal; return the turns restored"""
+        if self.journal is None:
+            return 0
+        state, records = self.journal.load()
+        if state is not None:
+            self.load_state(state)
+        for kind, payload in records:
+            self.apply_journal_record(kind, payload)
+        return self.conversation_history.total
+    
+    def close(self):
+        """Write a final snapshot and stop the journal"""
+        if self.journal is not None:
+            self.journal.close(self.snapshot_state())
+            self.journal = None
+    
+    def clear_history(self):
+        """Forget the conversation so far"""
+        self.conversation_history.clear()
+        if self.journal is not None:
+            self.journal.append('clear')
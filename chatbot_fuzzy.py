@@ -0,0 +1,125 @@
+"""Fuzzy intent matching for misspelled messages.
+
+The knowledge-base patterns only match exact words, so "helo" or "wether"
+used to fall through to the default replies. FuzzyIntentMatcher compares
+the words of such a message with every single-word intent keyword by
+their character trigrams ("#helo#" -> "#he", "hel", "elo", "lo#"):
+trigrams are hashed into BUCKETS columns, the keywords form a sparse
+keyword x trigram matrix stored column by column in NumPy arrays, and one
+message is scored against all keywords at once by gathering the columns
+of its trigrams and counting shared trigrams per (word, keyword) pair.
+
+A pair's similarity is the Dice coefficient of their trigram sets, and
+an intent scores its best pair. Only words and keywords of MIN_LENGTH or
+more characters take part, and a pair must agree on its first letter,
+which keeps "looking" from meaning "cooking". Multi-word keywords and
+patterns that are not plain word alternations are left to exact matching.
+
+NumPy is optional; without it there is no fuzzy matching.
+"""
+import zlib
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from chatbot_retrieval import WORD, literal_keywords
+
+BUCKETS = 1 << 18
+MIN_LENGTH = 4
+THRESHOLD = 0.6
+
+
+def trigram_buckets(word):
+    """Return the sorted hashed trigram buckets of a word"""
+    padded = f'#{word}#'
+    return sorted({zlib.crc32(padded[i:i + 3].encode('utf-8')) & (BUCKETS - 1)
+                   for i in range(len(padded) - 2)})
+
+
+class FuzzyIntentMatcher:
+    """Trigram similarity between message words and intent keywords"""
+
+    def __init__(self, knowledge_base, threshold=THRESHOLD):
+        self.threshold = threshold
+        self.categories = []
+        keyword_category = []
+        keyword_initial = []
+        keyword_size = []
+        cells = []  # (bucket, keyword)
+
+        for category, data in knowledge_base.items():
+            if category == 'default' or not data.get('patterns'):
+                continue
+            index = len(self.categories)
+            self.categories.append(category)
+            seen = set()
+            for pattern in data['patterns']:
+                for keyword in literal_keywords(pattern) or ():
+                    if keyword in seen or len(keyword) < MIN_LENGTH or not WORD.fullmatch(keyword):
+                        continue
+                    seen.add(keyword)
+                    buckets = trigram_buckets(keyword)
+                    cells.extend((bucket, len(keyword_category)) for bucket in buckets)
+                    keyword_category.append(index)
+                    keyword_initial.append(ord(keyword[0]))
+                    keyword_size.append(len(buckets))
+
+        self.keyword_category = np.array(keyword_category, dtype=np.int32)
+        self.keyword_initial = np.array(keyword_initial, dtype=np.int32)
+        self.keyword_size = np.array(keyword_size, dtype=np.float32)
+        # Column-compressed matrix: the keywords of bucket b are
+        # keywords[indptr[b]:indptr[b + 1]]
+        cells = np.array(cells, dtype=np.int64).reshape(-1, 2)
+        cells = cells[np.argsort(cells[:, 0], kind='stable')]
+        self.keywords = cells[:, 1].astype(np.int32)
+        self.indptr = np.zeros(BUCKETS + 1, dtype=np.int32)
+        np.cumsum(np.bincount(cells[:, 0], minlength=BUCKETS), out=self.indptr[1:])
+
+    def scores(self, text):
+        """Return [(category, similarity)] at or above the threshold, best first"""
+        words = [word for word in set(WORD.findall(text)) if len(word) >= MIN_LENGTH]
+        if not words or not len(self.keywords):
+            return []
+
+        columns, rows, word_size, word_initial = [], [], [], []
+        for row, word in enumerate(words):
+            buckets = trigram_buckets(word)
+            columns.extend(buckets)
+            rows.extend([row] * len(buckets))
+            word_size.append(len(buckets))
+            word_initial.append(ord(word[0]))
+        columns = np.array(columns, dtype=np.int64)
+
+        # Gather the matrix columns of every (word, trigram)
+        starts = self.indptr[columns]
+        lengths = self.indptr[columns + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return []
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        keywords = self.keywords[offsets + np.arange(total)]
+        pairs = np.repeat(np.array(rows, dtype=np.int64), lengths) * len(self.keyword_size) + keywords
+
+        # Shared trigrams per (word, keyword) pair, then Dice similarity
+        pairs, shared = np.unique(pairs, return_counts=True)
+        rows, keywords = np.divmod(pairs, len(self.keyword_size))
+        similarity = 2.0 * shared / (np.array(word_size, dtype=np.float32)[rows] + self.keyword_size[keywords])
+        keep = ((similarity >= self.threshold)
+                & (self.keyword_initial[keywords] == np.array(word_initial, dtype=np.int32)[rows]))
+        if not keep.any():
+            return []
+
+        best = {}
+        for category, score in zip(self.keyword_category[keywords[keep]].tolist(), similarity[keep].tolist()):
+            if score > best.get(category, 0.0):
+                best[category] = score
+        # Best first, ties in knowledge-base order
+        return [(self.categories[category], best[category])
+                for category in sorted(best, key=lambda category: (-best[category], category))]
+
+    def match(self, text):
+        """Return the intents lowercase text fuzzily matches, best first"""
+        return [category for category, _ in self.scores(text)]
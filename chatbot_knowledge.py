@@ -0,0 +1,280 @@
+"""Knowledge bases loaded from JSON files, with a compiled cache and hot reload.
+
+A knowledge file holds intents, default replies and advanced topics:
+
+    {
+      "intents": {
+        "greetings": {"patterns": ["\\\\b(hi|hello)\\\\b"], "responses": ["Hello!"]}
+      },
+      "default": ["Tell me more!"],
+      "advanced_topics": {"science": ["Science is the quest to understand our universe!"]}
+    }
+
+A directory of ``*.json`` files is merged in file-name order. The compiled
+Knowledge (matchers and indexes) is pickled next to the source together
+with a hash of the source files, and reused while that hash and
+CACHE_VERSION are unchanged. The cache is a trusted local file: anyone who
+can write it can run code in the bot.
+
+KnowledgeReloader watches the source and hands freshly compiled knowledge
+to a callback, normally ``ChatBotEngine.set_knowledge``, which swaps it in
+with a single assignment while messages keep being answered.
+
+    python chatbot_knowledge.py knowledge.json        compile and cache
+    python chatbot_knowledge.py --export-builtin kb.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+
+from chatbot_engine import Knowledge
+from chatbot_fuzzy import NUMPY_AVAILABLE
+
+# Bump whenever Knowledge or the classes it holds change shape
+CACHE_VERSION = 3
+
+
+def source_files(path):
+    """Return the knowledge files at path, a file or a directory"""
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith('.json')]
+    return [path]
+
+
+def source_signature(path):
+    """Return a cheap (name, size, mtime) fingerprint of the source files"""
+    signature = []
+    for name in source_files(path):
+        try:
+            stat = os.stat(name)
+        except OSError:
+            continue
+        signature.append((name, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def read_sources(path):
+    """Return ([parsed documents], source hash) for path"""
+    digest = hashlib.sha256(str(CACHE_VERSION).encode())
+    documents = []
+    for name in source_files(path):
+        with open(name, 'rb') as f:
+            data = f.read()
+        digest.update(os.path.basename(name).encode('utf-8') + b'\0' + data)
+        try:
+            documents.append(json.loads(data.decode('utf-8')))
+        except ValueError as e:
+            raise ValueError(f"{name}: {e}") from None
+    if not documents:
+        raise ValueError(f"No knowledge files found at {path}")
+    return documents, digest.hexdigest()
+
+
+def is_string_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def merge_documents(documents):
+    """Return (knowledge_base, advanced_topics) from parsed knowledge files
+
+    Raises ValueError for anything that is not the knowledge file format.
+    """
+    knowledge_base, advanced_topics, default = {}, {}, []
+    for document in documents:
+        if not isinstance(document, dict):
+            raise ValueError("A knowledge file must hold a JSON object")
+        intents = document.get('intents', {})
+        if not isinstance(intents, dict):
+            raise ValueError("'intents' must be an object")
+        for name, intent in intents.items():
+            if name == 'default':
+                raise ValueError("'default' is reserved for the default replies")
+            if (not isinstance(intent, dict) or not is_string_list(intent.get('patterns'))
+                    or not is_string_list(intent.get('responses'))):
+                raise ValueError(f"Intent {name!r} needs 'patterns' and 'responses' lists of strings")
+            if not intent['responses']:
+                raise ValueError(f"Intent {name!r} has no responses")
+            knowledge_base[name] = {'patterns': list(intent['patterns']),
+                                    'responses': list(intent['responses'])}
+        if not is_string_list(document.get('default', [])):
+            raise ValueError("'default' must be a list of strings")
+        default.extend(document.get('default', []))
+        topics = document.get('advanced_topics', {})
+        if not isinstance(topics, dict):
+            raise ValueError("'advanced_topics' must be an object")
+        for topic, responses in topics.items():
+            if not is_string_list(responses) or not responses:
+                raise ValueError(f"Topic {topic!r} needs a non-empty list of responses")
+            advanced_topics.setdefault(topic.lower(), []).extend(responses)
+    if not default:
+        raise ValueError("The knowledge base needs at least one 'default' reply")
+    knowledge_base['default'] = default
+    return knowledge_base, advanced_topics
+
+
+def default_cache_path(path):
+    if os.path.isdir(path):
+        return os.path.join(path, '.knowledge.cache')
+    return path + '.cache'
+
+
+def cache_header(source_hash):
+    # Knowledge compiled without NumPy has no fuzzy matcher
+    return {'version': CACHE_VERSION, 'source_hash': source_hash, 'numpy': NUMPY_AVAILABLE}
+
+
+def read_cache(cache_path, source_hash):
+    """Return the cached Knowledge for source_hash, or None
+
+    A missing, stale or corrupt cache is a miss; unpickling garbage can
+    raise almost anything, so every error counts as one.
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            header = pickle.load(f)
+            if header != cache_header(source_hash):
+                return None
+            knowledge = pickle.load(f)
+    except Exception:
+        return None
+    return knowledge if isinstance(knowledge, Knowledge) else None
+
+
+def write_cache(cache_path, knowledge):
+    """Write the cache atomically; a read-only location just skips it"""
+    tmp = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump(cache_header(knowledge.source_hash), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(knowledge, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def load_knowledge(path, cache_path=None):
+    """Return the compiled Knowledge for path, from the cache when it is current
+
+    Raises ValueError for malformed files and OSError when they cannot be read.
+    """
+    cache_path = cache_path or default_cache_path(path)
+    documents, source_hash = read_sources(path)
+    knowledge = read_cache(cache_path, source_hash)
+    if knowledge is None:
+        knowledge_base, advanced_topics = merge_documents(documents)
+        try:
+            knowledge = Knowledge(knowledge_base, advanced_topics, source_hash)
+        except re.error as e:
+            raise ValueError(f"Invalid pattern {e.pattern!r}: {e}") from None
+        write_cache(cache_path, knowledge)
+    return knowledge
+
+
+class KnowledgeReloader:
+    """Poll knowledge files and apply recompiled Knowledge when they change"""
+
+    def __init__(self, path, apply, interval=2.0, cache_path=None, source_hash=None):
+        self.path = path
+        self.apply = apply
+        self.interval = interval
+        self.cache_path = cache_path
+        self.signature = source_signature(path)
+        # Hash of the knowledge in use; unchanged sources are not reapplied
+        self.source_hash = source_hash
+        self.reloads = 0
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._watch, name="knowledge-reloader", daemon=True)
+        self._thread.start()
+        return self
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            signature = source_signature(self.path)
+            if signature != self.signature:
+                self.signature = signature
+                try:
+                    self.reload()
+                except Exception as e:
+                    # Never let one bad edit stop the watching
+                    self.error = f"{type(e).__name__}: {e}"
+
+    def reload(self):
+        """Compile the current files and apply them; return True if applied
+
+        Errors (e.g. a half-saved file) are kept in ``error`` and the
+        knowledge in use stays as it was.
+        """
+        try:
+            knowledge = load_knowledge(self.path, self.cache_path)
+        except (OSError, ValueError) as e:
+            self.error = str(e)
+            return False
+        self.error = None
+        if knowledge.source_hash == self.source_hash:
+            return False
+        self.source_hash = knowledge.source_hash
+        self.apply(knowledge)
+        self.reloads += 1
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+
+def export_builtin(path):
+    """Write the built-in knowledge base in the file format"""
+    from chatbot_engine import ChatBotEngine
+    from chatbot_nlp import NLPResources
+
+    engine = ChatBotEngine(nlp=NLPResources(download=False))
+    knowledge_base = dict(engine.knowledge_base)
+    document = {
+        'intents': {name: data for name, data in knowledge_base.items() if name != 'default'},
+        'default': knowledge_base['default'],
+        'advanced_topics': engine.advanced_topics,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a knowledge base and cache it")
+    parser.add_argument('path', nargs='?', help="knowledge file or directory")
+    parser.add_argument('--cache', help="cache file (default: next to the source)")
+    parser.add_argument('--export-builtin', metavar='PATH', help="write the built-in knowledge base as JSON")
+    args = parser.parse_args()
+
+    if args.export_builtin:
+        export_builtin(args.export_builtin)
+        return 0
+    if not args.path:
+        parser.error("a knowledge file or directory is required")
+    start = time.perf_counter()
+    try:
+        knowledge = load_knowledge(args.path, args.cache)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    intents = len(knowledge.knowledge_base) - 1
+    responses = sum(len(data['responses']) for name, data in knowledge.knowledge_base.items() if name != 'default')
+    print(f"{intents} intents, {responses} responses, {len(knowledge.advanced_topics)} topics "
+          f"loaded in {time.perf_counter() - start:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""Rolling latency histograms for the stages of a chat turn.
+
+Each stage keeps the bucket of its last ``window`` samples in a ring, so
+percentiles describe recent traffic and recording a sample is a couple of
+integer operations under a lock. With ``window=None`` every sample counts,
+and such timings from several processes can be merged. Buckets are log-spaced with eight steps
+per power of two, which puts reported percentiles within about 10% of the
+exact value.
+
+Engines take a StageTimings (or None, which turns timing off entirely):
+
+    timings = StageTimings()
+    start = timings.now()
+    ...
+    start = timings.since('match', start)
+"""
+import json
+import threading
+import time
+from collections import deque
+
+STAGES = ('tokenize', 'mood', 'match', 'generate', 'learn', 'ui')
+
+STAGE_LABELS = {
+    'tokenize': 'Tokenizing',
+    'mood': 'Mood detection',
+    'match': 'Pattern matching',
+    'generate': 'Response',
+    'learn': 'Learning',
+    'ui': 'UI round-trip',
+}
+
+SUB_BUCKET_BITS = 3
+BUCKET_COUNT = 64 << SUB_BUCKET_BITS
+
+
+def bucket_of(ns):
+    """Return the histogram bucket of a duration in nanoseconds"""
+    bits = ns.bit_length()
+    if bits <= SUB_BUCKET_BITS + 1:
+        return ns if ns > 0 else 0
+    shift = bits - SUB_BUCKET_BITS - 1
+    return (shift << SUB_BUCKET_BITS) + (ns >> shift)
+
+
+def bucket_value(bucket):
+    """Return the midpoint in nanoseconds of a bucket"""
+    shift, offset = divmod(bucket, 1 << SUB_BUCKET_BITS)
+    if shift <= 1:
+        return bucket
+    shift -= 1
+    low = (offset + (1 << SUB_BUCKET_BITS)) << shift
+    return low + (1 << shift) // 2
+
+
+class LatencyHistogram:
+    """Bucket counts over the last ``window`` samples (or all of them) of one stage"""
+
+    def __init__(self, window=1000):
+        self.counts = [0] * BUCKET_COUNT
+        self.samples = deque(maxlen=window) if window else None
+        self.size = 0  # samples currently counted
+        self.total = 0
+        self.max_ns = 0
+
+    def add(self, ns):
+        bucket = bucket_of(ns)
+        samples = self.samples
+        if samples is None:
+            self.size += 1
+        else:
+            if len(samples) == samples.maxlen:
+                self.counts[samples[0]] -= 1
+            else:
+                self.size += 1
+            samples.append(bucket)
+        self.counts[bucket] += 1
+        self.total += 1
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def merge(self, other):
+        """Add the counts of another cumulative histogram"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.size += other.size
+        self.total += other.total
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        """Return the duration in ns at each percentile of the window"""
+        size = self.size
+        if not size:
+            return [0] * len(quantiles)
+        ranks = [max(1, -(-size * q // 100)) for q in quantiles]
+        results = [None] * len(quantiles)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            if not count:
+                continue
+            seen += count
+            for i, rank in enumerate(ranks):
+                if results[i] is None and seen >= rank:
+                    results[i] = bucket_value(bucket)
+            if seen >= ranks[-1] and None not in results:
+                break
+        return results
+
+
+class StageTimings:
+    """Thread-safe rolling histograms for every turn stage"""
+
+    now = staticmethod(time.perf_counter_ns)
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self.histograms = {stage: LatencyHistogram(window) for stage in STAGES}
+
+    def __getstate__(self):
+        with self._lock:
+            return dict(self.__dict__, _lock=None)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _lock=threading.Lock())
+
+    def record(self, stage, ns):
+        """Add one duration in nanoseconds to a stage"""
+        with self._lock:
+            self.histograms[stage].add(ns)
+
+    def since(self, stage, start):
+        """Record the time since ``start`` (from now()); return the current time"""
+        end = time.perf_counter_ns()
+        with self._lock:
+            self.histograms[stage].add(end - start)
+        return end
+
+    def summary(self):
+        """Return {stage: {count, p50_ms, p95_ms, p99_ms, max_ms}} for sampled stages"""
+        summary = {}
+        with self._lock:
+            for stage, histogram in self.histograms.items():
+                if not histogram.total:
+                    continue
+                # Bucket midpoints can overshoot the largest sample
+                p50, p95, p99 = (min(p, histogram.max_ns) for p in histogram.percentiles())
+                summary[stage] = {
+                    'count': histogram.total,
+                    'window': histogram.size,
+                    'p50_ms': p50 / 1e6,
+                    'p95_ms': p95 / 1e6,
+                    'p99_ms': p99 / 1e6,
+                    'max_ms': histogram.max_ns / 1e6,
+                }
+        return summary
+
+    def format(self):
+        """Return the summary as text lines for the statistics panel"""
+        lines = []
+        for stage, data in self.summary().items():
+            lines.append(f"{STAGE_LABELS[stage]:<17}{data['p50_ms']:8.2f}{data['p95_ms']:8.2f}"
+                         f"{data['p99_ms']:8.2f} ms  ({data['count']})")
+        return lines
+
+    def merge(self, other):
+        """Add another StageTimings' samples; both must have window=None"""
+        with self._lock:
+            for stage, histogram in other.histograms.items():
+                self.histograms[stage].merge(histogram)
+
+    def dump(self, path):
+        """Write the summary to a JSON file"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'timestamp': time.time(), 'window': self.window, 'stages': self.summary()}, f, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {stage: LatencyHistogram(self.window) for stage in STAGES}
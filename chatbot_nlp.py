@@ -0,0 +1,384 @@
+"""Lazily loaded NLTK resources for the Advanced AI ChatBot.
+
+Importing this module never touches the network or the NLTK data files.
+The sentiment lexicon, stopwords, punkt and WordNet are loaded on a
+background thread by ``NLPResources.start``; until they are ready the
+engine answers through its basic text processing path.
+
+``ProcessNLPBackend`` optionally moves tokenizing, lemmatizing and VADER
+scoring into worker processes so they run outside the GIL.
+
+Keyword extraction tokenizes with punkt + ``word_tokenize`` by default; the
+``'fast'`` tokenizer is a single-pass lexer that reproduces the word tokens
+``word_tokenize`` yields for ordinary chat text without loading punkt.
+Lemmas are memoized in a bounded cache in front of WordNet.
+
+``extract_features_batch`` scores a whole batch's sentiment at once with
+``chatbot_sentiment.BatchSentimentScorer``.
+"""
+import functools
+import itertools
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from chatbot_sentiment import BatchSentimentScorer
+
+# Try to import NLTK for advanced features
+try:
+    import nltk
+    NLTK_AVAILABLE = True
+except ImportError:
+    NLTK_AVAILABLE = False
+    print("NLTK not available. Using basic text processing.")
+
+# Resource states
+NLP_UNAVAILABLE = 'unavailable'
+NLP_PENDING = 'pending'
+NLP_LOADING = 'loading'
+NLP_READY = 'ready'
+NLP_FAILED = 'failed'
+
+# (nltk.data path, download package) pairs needed for the advanced path
+NLTK_RESOURCES = [
+    ('tokenizers/punkt', 'punkt'),
+    ('corpora/stopwords', 'stopwords'),
+    ('sentiment/vader_lexicon.zip', 'vader_lexicon'),
+    ('corpora/wordnet', 'wordnet'),
+]
+
+# Keyword tokenizers: 'punkt' (word_tokenize) or 'fast' (fast_tokenize)
+TOKENIZERS = ('punkt', 'fast')
+
+# Characters word_tokenize always splits off, plus ellipses, double dashes,
+# doubled quotes and ':' or ',' not followed by a digit
+_FAST_SPLIT = re.compile(r"([\s;@#$%&?!*()\[\]{}<>\"`«“‘„»”’‒-―]+|\.{2,}|--|''|[:,](?!\d))")
+# Separators padded before the Treebank rule splitting a quote off a word
+_FAST_EARLY_PADDED = frozenset(' \t\n\r\f\v:,.;@#$%&‒–—―?!«“‘„`')
+# A quote opening a word, unless it starts a clitic ('s, 're, ...)
+_FAST_OPEN_QUOTE = re.compile(r"(?<!\w)'(?!(?:re|ve|ll|m|t|s|d|n)\b)(?=\w)")
+# word_tokenize's MacIntyre contractions, split wherever they form a word
+_FAST_CONTRACTION = re.compile(r"\b(?:cannot|gimme|gonna|gotta|lemme|more'n)\b"
+                               r"|\bwanna(?![\w/+=~^|\\-]|\.\w)")
+_FAST_CONTRACTIONS = {
+    'cannot': ' can not ',
+    'gimme': ' gim me ',
+    'gonna': ' gon na ',
+    'gotta': ' got ta ',
+    'lemme': ' lem me ',
+    "more'n": " more 'n ",
+    'wanna': ' wan na ',
+}
+# Characters after a period that let punkt end a sentence there
+_FAST_AFTER_PERIOD = frozenset('?!)";}]*:@\'({[')
+_FAST_CLOSERS = ']})>"\''
+# Characters a punkt word token cannot start with
+_FAST_NON_START = '("`{[:;&#*@)}]-,'
+_FAST_CLITICS = ("n't", "'ll", "'re", "'ve")
+
+
+def _fast_sentence_periods(runs, i):
+    """Return the positions of periods that end a sentence in runs[i]
+
+    Mirrors punkt without abbreviation data, which breaks after the last
+    sentence-ending character followed by whitespace or punctuation, and the
+    Treebank rule splitting off the text's final period.
+    """
+    run = runs[i]
+    last_run = i == len(runs) - 1
+    periods = []
+    for end in range(len(run) - 1, 0, -1):
+        if run[end] not in '.?!':
+            continue
+        rest = run[end + 1:]
+        if not (rest[:1] in _FAST_AFTER_PERIOD if rest else not last_run):
+            continue
+        if run[end] == '.' and run[end - 1] != '.':
+            # A single letter and period is an initial unless a sentence starts next
+            word = run[:end].lstrip(_FAST_NON_START)
+            following = rest or runs[i + 1]
+            if not (len(word) == 1 and word.isalpha()
+                    and (following[0].islower() or following[0] in ';:,' or following in ('.', '!', '?'))):
+                periods.append(end)
+        break
+    if last_run:
+        end = run.rfind('.')
+        if end > 0 and run[end - 1] != '.' and not run[end + 1:].strip(_FAST_CLOSERS):
+            periods.append(end)
+    return periods
+
+
+def fast_tokenize(text):
+    """Return the alphabetic tokens ``word_tokenize`` finds in lowercase text
+
+    One split regex replaces punkt plus the Treebank substitutions. Without
+    punkt's abbreviation data every "word." ends a sentence, so "mr." and
+    similar abbreviations can still differ from ``word_tokenize``.
+    """
+    text = _FAST_OPEN_QUOTE.sub("' ", text)
+    text = _FAST_CONTRACTION.sub(lambda match: _FAST_CONTRACTIONS[match.group()], text)
+    tokens = []
+    runs = text.split()
+    for i, run in enumerate(runs):
+        if run.isalpha():
+            tokens.append(run)
+            continue
+        for period in _fast_sentence_periods(runs, i):
+            run = run[:period] + ' ' + run[period + 1:]
+        parts = _FAST_SPLIT.split(run)
+        for k in range(0, len(parts), 2):
+            chunk = parts[k]
+            if chunk.isalpha():
+                tokens.append(chunk)
+                continue
+            if not chunk:
+                continue
+            if chunk == "d'ye":
+                tokens.append('d')
+                continue
+            # Trailing clitics and quotes are split off; a quote not followed
+            # by a space splits off in the same pass as 's, 'm and 'd
+            split_late = False
+            if len(chunk) > 1 and chunk[-1] == "'" and chunk[-2] != "'":
+                chunk = chunk[:-1]
+                following = parts[k + 1][:1] if k + 1 < len(parts) else ('' if i == len(runs) - 1 else ' ')
+                split_late = following not in _FAST_EARLY_PADDED
+            if not split_late and len(chunk) > 2 and chunk[-2] == "'" and chunk[-1] in 'smd' and chunk[-3] != "'":
+                chunk = chunk[:-2]
+            if len(chunk) > 3 and chunk[-3:] in _FAST_CLITICS and chunk[-4] != "'":
+                chunk = chunk[:-3]
+            if chunk.isalpha():
+                tokens.append(chunk)
+    return tokens
+
+
+class NLPResources:
+    """Background warm-up and access point for the NLTK models"""
+
+    def __init__(self, download=True, tokenizer='punkt', lemma_cache_size=4096):
+        if tokenizer not in TOKENIZERS:
+            raise ValueError(f"Unknown tokenizer: {tokenizer!r}")
+        self.download = download
+        self.tokenizer = tokenizer
+        self.lemma_cache_size = lemma_cache_size
+        self.state = NLP_PENDING if NLTK_AVAILABLE else NLP_UNAVAILABLE
+        self.error = None
+        self.sentiment_analyzer = None
+        self.batch_sentiment = None
+        self.lemmatizer = None
+        self.lemmatize = None
+        self.stop_words = frozenset()
+        self.word_tokenize = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._ready_event = threading.Event()
+        if not NLTK_AVAILABLE:
+            self._ready_event.set()
+
+    @property
+    def ready(self):
+        return self.state == NLP_READY
+
+    def add_listener(self, callback):
+        """Call ``callback(state)`` whenever the state changes"""
+        self._listeners.append(callback)
+
+    def start(self):
+        """Begin loading on a daemon thread (safe to call repeatedly)"""
+        with self._lock:
+            if self.state != NLP_PENDING:
+                return
+            self._set_state(NLP_LOADING)
+        threading.Thread(target=self.load, daemon=True).start()
+
+    def wait(self, timeout=None):
+        """Block until loading has finished; return True if ready"""
+        self._ready_event.wait(timeout)
+        return self.ready
+
+    def load(self):
+        """Load every NLTK resource, downloading missing ones if allowed"""
+        try:
+            missing = []
+            for path, package in NLTK_RESOURCES:
+                if package == 'punkt' and self.tokenizer == 'fast':
+                    continue
+                try:
+                    nltk.data.find(path)
+                except LookupError:
+                    missing.append(package)
+
+            if missing:
+                if not self.download:
+                    raise LookupError(f"Missing NLTK data: {', '.join(missing)}")
+                for package in missing:
+                    nltk.download(package, quiet=True)
+                if 'wordnet' in missing:
+                    nltk.download('omw-1.4', quiet=True)
+
+            from nltk.sentiment import SentimentIntensityAnalyzer
+            from nltk.tokenize import word_tokenize
+            from nltk.corpus import stopwords
+            from nltk.stem import WordNetLemmatizer
+
+            sentiment_analyzer = SentimentIntensityAnalyzer()
+            lemmatizer = WordNetLemmatizer()
+            stop_words = frozenset(stopwords.words('english'))
+
+            # Touch punkt and WordNet now so the first message doesn't pay for it
+            if self.tokenizer == 'punkt':
+                try:
+                    word_tokenize("Warming up the tokenizer.")
+                except LookupError:
+                    # Newer NLTK releases tokenize with the punkt_tab tables
+                    if not self.download:
+                        raise
+                    nltk.download('punkt_tab', quiet=True)
+                    word_tokenize("Warming up the tokenizer.")
+            lemmatizer.lemmatize('warming')
+
+            self.sentiment_analyzer = sentiment_analyzer
+            self.batch_sentiment = BatchSentimentScorer(sentiment_analyzer)
+            self.lemmatizer = lemmatizer
+            # Chat vocabulary repeats a lot; skip WordNet for words seen before
+            self.lemmatize = functools.lru_cache(maxsize=self.lemma_cache_size)(lemmatizer.lemmatize)
+            self.stop_words = stop_words
+            self.word_tokenize = word_tokenize if self.tokenizer == 'punkt' else fast_tokenize
+            self._set_state(NLP_READY)
+        except Exception as e:
+            self.error = e
+            self._set_state(NLP_FAILED)
+        finally:
+            self._ready_event.set()
+
+    def _set_state(self, state):
+        self.state = state
+        for callback in list(self._listeners):
+            try:
+                callback(state)
+            except Exception:
+                pass
+
+
+def extract_features(resources, text, mood_detection=True):
+    """Return (keywords, sentiment) for text using loaded resources"""
+    keywords, sentiment = [], None
+    try:
+        tokens = resources.word_tokenize(text.lower())
+        lemmatize = resources.lemmatize
+        stop_words = resources.stop_words
+        # Top 10 keywords; later tokens are never lemmatized
+        keywords = [lemmatize(word) for word in itertools.islice(
+            (word for word in tokens if word.isalpha() and word not in stop_words), 10)]
+
+        # Sentiment analysis
+        if mood_detection:
+            try:
+                sentiment = resources.sentiment_analyzer.polarity_scores(text)
+            except Exception:
+                sentiment = None
+    except Exception:
+        pass
+    return keywords, sentiment
+
+
+def extract_features_batch(resources, texts, mood_detection=True):
+    """Return (keywords, sentiment) for each text, scoring sentiment in one batch"""
+    features = [extract_features(resources, text, False) for text in texts]
+    if mood_detection and features:
+        try:
+            sentiments = resources.batch_sentiment.polarity_scores(texts)
+        except Exception:
+            sentiments = [None] * len(texts)
+        features = [(keywords, sentiment) for (keywords, _), sentiment in zip(features, sentiments)]
+    return features
+
+
+# Per-process resources for ProcessNLPBackend workers
+_worker_resources = None
+
+
+def _init_worker(download, tokenizer='punkt'):
+    global _worker_resources
+    _worker_resources = NLPResources(download=download, tokenizer=tokenizer)
+    if NLTK_AVAILABLE:
+        _worker_resources.load()
+
+
+def _worker_ready():
+    return _worker_resources is not None and _worker_resources.ready
+
+
+def _worker_extract_batch(texts, mood_detection):
+    if not _worker_ready():
+        return [None] * len(texts)
+    return extract_features_batch(_worker_resources, texts, mood_detection)
+
+
+class ProcessNLPBackend:
+    """Process pool that runs NLTK feature extraction on every core"""
+
+    def __init__(self, workers=None, batch_size=32, download=False, tokenizer='punkt'):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        # Spawned workers re-import the parent's main module (ChatBot.py
+        # under the GUI, which then loads tkinter but opens no window) and
+        # run only this module's worker functions
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(download, tokenizer)
+        )
+        self._probe = self.executor.submit(_worker_ready)
+
+    @property
+    def ready(self):
+        """True once a worker has loaded the NLTK models"""
+        if not self._probe.done():
+            return False
+        try:
+            return bool(self._probe.result())
+        except Exception:
+            return False
+
+    def wait(self, timeout=None):
+        """Block until the first worker has finished loading"""
+        try:
+            self._probe.result(timeout)
+        except Exception:
+            pass
+        return self.ready
+
+    def extract(self, texts, mood_detection=True):
+        """Return (keywords, sentiment) or None for each text, in order"""
+        texts = list(texts)
+        size = max(1, min(self.batch_size, -(-len(texts) // self.workers)))
+        futures = [self.executor.submit(_worker_extract_batch, texts[i:i + size], mood_detection)
+                   for i in range(0, len(texts), size)]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+_shared_resources = None
+_shared_lock = threading.Lock()
+
+
+def get_nlp_resources():
+    """Return the process-wide NLPResources, starting its warm-up
+
+    ``CHATBOT_TOKENIZER=fast`` selects the fast keyword tokenizer.
+    """
+    global _shared_resources
+    with _shared_lock:
+        if _shared_resources is None:
+            _shared_resources = NLPResources(tokenizer=os.environ.get('CHATBOT_TOKENIZER', 'punkt'))
+    _shared_resources.start()
+    return _shared_resources
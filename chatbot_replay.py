@@ -0,0 +1,249 @@
+"""Replay a recorded corpus of user messages through headless bots.
+
+    python chatbot_replay.py corpus.jsonl --output replies.jsonl [--workers 4] [--seed 0]
+                             [--max-sessions 10000]
+
+Each input line (optionally gzip-compressed) is a JSON string or an object
+with a "message" (or an export's "user" field) and an optional
+"conversation" id; export headers are skipped. Every conversation is
+answered in order by its own fresh bot session, always in the same worker
+process, and every message draws from a random.Random seeded with --seed
+and its line number. The output is therefore byte-identical for any
+number of workers. Messages without a conversation id stand alone.
+
+At most --max-sessions conversations are kept open at once, so memory
+stays bounded however many a corpus holds. When a new conversation would
+exceed the cap, the one whose last message is oldest in input order is
+closed; should it come back, it continues in a fresh session. Which
+sessions close depends only on the input order, not on the workers.
+
+The output has one JSON line per message, in input order, with the reply
+and its analysis. A summary with messages/sec and per-stage latency
+percentiles goes to stderr.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import random
+import sys
+import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from chatbot_engine import ChatBotEngine
+from chatbot_metrics import STAGE_LABELS, StageTimings
+from chatbot_nlp import NLPResources
+from chatbot_storage import iter_export, open_export
+
+
+def read_corpus(path):
+    """Yield (index, conversation, message) for every message in a corpus"""
+    index = 0
+    for record in iter_export(path):
+        if isinstance(record, str):
+            conversation, message = None, record
+        elif record.get('type') == 'header':
+            continue
+        else:
+            conversation = record.get('conversation')
+            message = record.get('message', record.get('user'))
+        if not isinstance(message, str) or not message.strip():
+            continue
+        yield index, conversation, message
+        index += 1
+
+
+def worker_for(index, conversation, workers):
+    """Return the worker that answers a message; fixed per conversation"""
+    if conversation is None:
+        return index % workers
+    return zlib.crc32(json.dumps(conversation).encode('utf-8')) % workers
+
+
+class ReplayWorker:
+    """Bot sessions for the conversations routed to one process"""
+
+    def __init__(self, bot_settings, seed=0, nlp='auto', tokenizer='punkt', knowledge_path=None):
+        resources = NLPResources(download=False, tokenizer=tokenizer)
+        if nlp != 'basic':
+            resources.load()
+            if nlp == 'nltk' and not resources.ready:
+                raise RuntimeError(f"NLTK resources unavailable: {resources.error}")
+        knowledge = None
+        if knowledge_path:
+            from chatbot_knowledge import load_knowledge
+            knowledge = load_knowledge(knowledge_path)
+        self.bot_settings = bot_settings
+        self.seed = seed
+        self.engine = ChatBotEngine(bot_settings, nlp=resources, timings=StageTimings(window=None),
+                                    knowledge=knowledge)
+        self.sessions = {}
+
+    def nlp_mode(self):
+        return self.engine.nlp_mode()
+
+    def run(self, messages, closed=()):
+        """Return (index, JSON line) for each (index, conversation, message, fresh)
+
+        ``fresh`` starts the conversation in a new session; the sessions of
+        ``closed`` conversations are dropped once the messages are answered.
+        """
+        results = []
+        for index, conversation, message, fresh in messages:
+            if conversation is None:
+                session = self.engine.new_session(self.bot_settings)
+            elif fresh:
+                session = self.sessions[conversation] = self.engine.new_session(self.bot_settings)
+            else:
+                session = self.sessions[conversation]
+            session.rng = random.Random(f"{self.seed}:{index}")
+            analysis = session.analyze_input(message)
+            response = session.complete_turn(message, analysis)
+            record = {
+                'index': index,
+                'conversation': conversation,
+                'message': message,
+                'response': response,
+                'intent': analysis['intent'],
+                'categories': analysis['categories'],
+                'keywords': analysis['keywords'],
+                'sentiment': analysis['sentiment'],
+            }
+            results.append((index, json.dumps(record, ensure_ascii=False) + '\n'))
+        for conversation in closed:
+            self.sessions.pop(conversation, None)
+        return results
+
+
+# Per-process ReplayWorker for the pool
+_worker = None
+
+
+def _init_worker(*args):
+    global _worker
+    _worker = ReplayWorker(*args)
+
+
+def _worker_nlp_mode():
+    return _worker.nlp_mode()
+
+
+def _worker_run(messages, closed):
+    return _worker.run(messages, closed)
+
+
+def _worker_timings():
+    return _worker.engine.timings
+
+
+def replay(path, output, workers=1, seed=0, bot_settings=None, nlp='auto', tokenizer='punkt',
+           knowledge_path=None, chunk_size=2000, max_inflight=4, progress=None, max_sessions=10000):
+    """Replay a corpus into ``output``; return (messages, seconds, merged StageTimings)
+
+    ``workers`` single-process pools each own a fixed share of the
+    conversations, so every conversation sees its messages in order.
+    Each worker holds at most ``max_sessions`` sessions between chunks.
+    """
+    context = multiprocessing.get_context('spawn')
+    initargs = (bot_settings or {}, seed, nlp, tokenizer, knowledge_path)
+    pools = [ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                 initializer=_init_worker, initargs=initargs)
+             for _ in range(workers)]
+    try:
+        # Workers must analyze alike, or the output would depend on routing
+        modes = {pool.submit(_worker_nlp_mode).result() for pool in pools}
+        if len(modes) > 1:
+            raise RuntimeError(f"Workers loaded different NLP modes: {sorted(map(str, modes))}")
+
+        start = time.perf_counter()
+        count = 0
+        inflight = deque()
+        # Open conversations, least recently seen first
+        open_conversations = OrderedDict()
+
+        def write_oldest():
+            results = sorted(itertools.chain.from_iterable(future.result() for future in inflight.popleft()))
+            out.writelines(line for _, line in results)
+            return len(results)
+
+        with open_export(output, 'w') as out:
+            messages = read_corpus(path)
+            while True:
+                chunk = list(itertools.islice(messages, chunk_size))
+                if not chunk:
+                    break
+                shares = [[] for _ in pools]
+                closed = {}
+                for index, conversation, message in chunk:
+                    fresh = False
+                    if conversation is not None:
+                        key = json.dumps(conversation)
+                        if key in open_conversations:
+                            open_conversations.move_to_end(key)
+                        else:
+                            fresh = True
+                            open_conversations[key] = conversation
+                            if len(open_conversations) > max_sessions:
+                                key, oldest = open_conversations.popitem(last=False)
+                                closed[key] = oldest
+                    shares[worker_for(index, conversation, workers)].append((index, conversation, message, fresh))
+                # Conversations closed and reopened within the chunk stay open
+                closing = [[] for _ in pools]
+                for key, conversation in closed.items():
+                    if key not in open_conversations:
+                        closing[worker_for(None, conversation, workers)].append(conversation)
+                inflight.append([pool.submit(_worker_run, share, close)
+                                 for pool, share, close in zip(pools, shares, closing) if share or close])
+                while len(inflight) > max_inflight:
+                    count += write_oldest()
+                    if progress is not None:
+                        progress(count)
+            while inflight:
+                count += write_oldest()
+        elapsed = time.perf_counter() - start
+
+        timings = StageTimings(window=None)
+        for pool in pools:
+            timings.merge(pool.submit(_worker_timings).result())
+        return count, elapsed, timings
+    finally:
+        for pool in pools:
+            pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a JSONL corpus of user messages through the chatbot")
+    parser.add_argument('corpus', help=".jsonl or .jsonl.gz corpus")
+    parser.add_argument('--output', required=True, help="replies as JSONL (.gz to compress)")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--personality', default='friendly')
+    parser.add_argument('--style', default='detailed')
+    parser.add_argument('--nlp', choices=('auto', 'nltk', 'basic'), default='auto',
+                        help="auto uses NLTK when its data is installed")
+    parser.add_argument('--tokenizer', choices=('punkt', 'fast'), default='punkt')
+    parser.add_argument('--knowledge', metavar='PATH', help="knowledge base JSON file or directory")
+    parser.add_argument('--max-sessions', type=int, default=10000,
+                        help="conversations kept open at once; older ones restart if they return")
+    args = parser.parse_args()
+
+    settings = {'personality': args.personality, 'response_style': args.style}
+
+    def progress(count):
+        print(f"\r{count} messages", end='', file=sys.stderr, flush=True)
+
+    messages, elapsed, timings = replay(args.corpus, args.output, max(1, args.workers), args.seed, settings,
+                                        args.nlp, args.tokenizer, args.knowledge, progress=progress,
+                                        max_sessions=max(1, args.max_sessions))
+    print(f"\r{messages} messages in {elapsed:.2f}s ({messages / elapsed if elapsed else 0:.0f} msg/s, "
+          f"{args.workers} workers)", file=sys.stderr)
+    print(f"{'Stage':<17}{'p50':>8}{'p95':>8}{'p99':>8} ms", file=sys.stderr)
+    for stage, data in timings.summary().items():
+        print(f"{STAGE_LABELS[stage]:<17}{data['p50_ms']:8.3f}{data['p95_ms']:8.3f}{data['p99_ms']:8.3f}",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Pre-rendered reply variants for each personality and response style.
+
+``customize_response`` used to rebuild every reply: add the mood
+acknowledgment, apply the personality's edits, then cut or extend the
+text for the response style. All of that depends only on the response,
+the mood and the settings, so ResponseVariants renders it once per
+(response, mood) and keeps the result split around the point where
+random extras go.
+A reply is then the random joke or flourish (if any) between head and
+tail, plus the user's name in NAME_SLOT.
+
+Variants are rendered on first use and kept with the Knowledge they came
+from, so reloading the knowledge base or switching personality or style
+uses a fresh table.
+"""
+import random
+
+# Marks where the user's name goes in a response template
+NAME_SLOT = '\0'
+
+PERSONALITIES = ('friendly', 'professional', 'humorous', 'technical')
+RESPONSE_STYLES = ('brief', 'detailed', 'creative')
+
+MOOD_PREFIXES = {
+    None: "",
+    'down': "I sense you might be feeling down. 💙 ",
+    'up': "I can feel your positive energy! ✨ ",
+}
+
+JOKES = [" (I crack myself up! 😄)", " *virtual dad joke incoming*", " (That's my attempt at humor! 🤪)"]
+CREATIVE_ADDITIONS = [
+    " ✨ Life is full of interesting conversations!",
+    " 🌈 Every chat teaches me something new!",
+    " 🚀 Our conversation is taking off!"
+]
+TECH_WORDS = ['technology', 'programming', 'code']
+TECH_FOLLOW_UP = " Would you like to dive deeper into the technical aspects?"
+
+
+def mood_of(sentiment):
+    """Return the MOOD_PREFIXES key for a sentiment score dict"""
+    if sentiment:
+        if sentiment['compound'] < -0.5:
+            return 'down'
+        if sentiment['compound'] > 0.5:
+            return 'up'
+    return None
+
+
+def render(text, mood, personality, style):
+    """Return (head, tail, keeps_extra) for a response
+
+    The random joke or creative addition goes between head and tail, or
+    is dropped when keeps_extra is False (a brief reply already cut short).
+    Jokes and additions contain no '.', so the brief cut never depends on
+    them.
+    """
+    response = MOOD_PREFIXES[mood] + text
+
+    # Adjust for personality
+    if personality == 'professional':
+        response = response.replace('!', '.').replace('😊', '').replace('🤗', '')
+    elif personality == 'technical':
+        lowered = response.lower()
+        if any(word in lowered for word in TECH_WORDS):
+            response += TECH_FOLLOW_UP
+
+    # Adjust for response style
+    if style == 'brief':
+        if '.' in response:
+            return response.split('.')[0] + '.', '', False
+        return response, '.', True
+    return response, '', True
+
+
+class ResponseVariants:
+    """Rendered responses for one personality and style"""
+
+    def __init__(self, personality, style, max_entries=100000):
+        self.personality = personality
+        self.style = style
+        self.max_entries = max_entries
+        self.humorous = personality == 'humorous'
+        self.creative = style == 'creative'
+        # (response, mood) -> (reply without extras, head, tail, keeps_extra, has_slot)
+        self.variants = {}
+
+    def variant(self, text, mood):
+        head, tail, keeps_extra = render(text, mood, self.personality, self.style)
+        variant = (head + tail, head, tail, keeps_extra, NAME_SLOT in text)
+        if len(self.variants) < self.max_entries:
+            self.variants[(text, mood)] = variant
+        return variant
+
+    def render(self, text, mood=None, name_prefix="", rng=random):
+        """Return the reply for a response (or template with NAME_SLOT)"""
+        response, head, tail, keeps_extra, has_slot = self.variants.get((text, mood)) or self.variant(text, mood)
+
+        # The same random draws as rendering from scratch, in the same order
+        extra = ""
+        if self.humorous and rng.random() < 0.3:
+            extra = rng.choice(JOKES)
+        if self.creative and rng.random() < 0.4:
+            extra += rng.choice(CREATIVE_ADDITIONS)
+        if extra and keeps_extra:
+            response = head + extra + tail
+
+        if has_slot:
+            if (self.personality == 'technical' and name_prefix
+                    and any(word in name_prefix.lower() for word in TECH_WORDS)):
+                # The name itself triggers the technical follow-up; render it in place
+                head, tail, keeps_extra = render(text.replace(NAME_SLOT, name_prefix), mood,
+                                                 self.personality, self.style)
+                return head + extra + tail if extra and keeps_extra else head + tail
+            response = response.replace(NAME_SLOT, name_prefix)
+        return response
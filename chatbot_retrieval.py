@@ -0,0 +1,202 @@
+"""Inverted-index retrieval over the knowledge base.
+
+Knowledge-base patterns of the usual ``\\b(word|two words|...)\\b`` form are
+split into literal keywords and indexed by their first word, so matching a
+message costs one dictionary lookup per word it contains, however many
+intents there are. Patterns that are not plain word alternations are kept
+as regular expressions and scanned as before.
+
+Matched categories are ranked with BM25 over each category's keywords and
+response text, and a category's reply is the response that best matches
+the message (chosen at random among equally good ones). Term statistics
+are computed when the index is built; the weights of one category or
+response group are derived from them the first time it is scored, which
+keeps the index small to build, pickle and load.
+"""
+import math
+import random
+import re
+
+WORD = re.compile(r'\w+')
+WORD_CHAR = re.compile(r'\w')
+
+# A literal keyword: word characters with inner spaces, apostrophes or hyphens
+LITERAL = re.compile(r"\w(?:[\w' -]*\w)?")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def literal_keywords(pattern):
+    """Return the keywords of a ``\\b(a|b c|...)\\b`` pattern, or None"""
+    if not (pattern.startswith(r'\b') and pattern.endswith(r'\b')):
+        return None
+    body = pattern[2:-2]
+    if body.startswith('(?:') and body.endswith(')'):
+        body = body[3:-1]
+    elif body.startswith('(') and body.endswith(')'):
+        body = body[1:-1]
+    keywords = []
+    for alternative in body.split('|'):
+        keyword = re.sub(r"\\(['\- ])", r'\1', alternative)
+        if not LITERAL.fullmatch(keyword) or keyword != keyword.lower():
+            return None
+        keywords.append(keyword)
+    return keywords
+
+
+def bm25_statistics(documents):
+    """Return ({term: idf}, average length) for lists of terms"""
+    count = 0
+    length = 0
+    frequency = {}
+    for terms in documents:
+        count += 1
+        length += len(terms)
+        for term in set(terms):
+            frequency[term] = frequency.get(term, 0) + 1
+    idf = {term: math.log(1 + (count - n + 0.5) / (n + 0.5)) for term, n in frequency.items()}
+    return idf, length / count if count else 0.0
+
+
+def bm25_weights(terms, idf, average):
+    """Return {term: weight} for one document"""
+    tf = {}
+    for term in terms:
+        tf[term] = tf.get(term, 0) + 1
+    norm = K1 * (1 - B + B * len(terms) / average) if average else K1
+    return {term: idf.get(term, 0.0) * n * (K1 + 1) / (n + norm) for term, n in tf.items()}
+
+
+class ResponseIndex:
+    """BM25 scoring over groups of candidate responses"""
+
+    def __init__(self, groups):
+        self.groups = {key: list(group) for key, group in groups.items()}
+        self.idf, self.average = bm25_statistics(
+            WORD.findall(response.lower()) for group in self.groups.values() for response in group)
+        # group -> term -> [(response index within the group, weight)], built on first use
+        self._postings = {}
+
+    def __getstate__(self):
+        return dict(self.__dict__, _postings={})
+
+    def postings(self, key):
+        postings = self._postings.get(key)
+        if postings is None:
+            postings = {}
+            for index, response in enumerate(self.groups[key]):
+                for term, weight in bm25_weights(WORD.findall(response.lower()), self.idf, self.average).items():
+                    postings.setdefault(term, []).append((index, weight))
+            self._postings[key] = postings
+        return postings
+
+    def best(self, key, terms, rng=random):
+        """Return the response of a group that best matches the query terms"""
+        group = self.groups[key]
+        postings = self.postings(key)
+        scores = {}
+        for term in terms:
+            for index, weight in postings.get(term, ()):
+                scores[index] = scores.get(index, 0.0) + weight
+        if not scores:
+            return rng.choice(group)
+        top = max(scores.values())
+        return group[rng.choice([index for index, score in sorted(scores.items()) if score == top])]
+
+
+class RetrievalIndex:
+    """Keyword matching, category ranking and response choice for a knowledge base"""
+
+    def __init__(self, knowledge_base, advanced_topics=None):
+        self.order = {}
+        self.phrases = {}  # first word -> [(keyword, category)]
+        self.residual = []  # (compiled pattern, category) for non-literal patterns
+        self.keyword_terms = {}  # category -> words of its literal keywords
+
+        for category, data in knowledge_base.items():
+            if category == 'default' or not data.get('patterns'):
+                continue
+            self.order[category] = len(self.order)
+            terms = self.keyword_terms[category] = []
+            for pattern in data['patterns']:
+                keywords = literal_keywords(pattern)
+                if keywords is None:
+                    self.residual.append((re.compile(pattern), category))
+                    continue
+                for keyword in keywords:
+                    words = WORD.findall(keyword)
+                    terms.extend(words)
+                    entries = self.phrases.setdefault(words[0], [])
+                    if (keyword, category) not in entries:
+                        entries.append((keyword, category))
+
+        self.responses = ResponseIndex({category: knowledge_base[category]['responses']
+                                        for category in self.order})
+        self.topic_responses = ResponseIndex(advanced_topics or {})
+
+        # A category's document is its keywords plus its responses
+        self.idf, self.average = bm25_statistics(self.category_terms(category) for category in self.order)
+        # category -> {term: weight}, built on first use
+        self._category_weights = {}
+
+    def __getstate__(self):
+        return dict(self.__dict__, _category_weights={})
+
+    def category_terms(self, category):
+        terms = list(self.keyword_terms[category])
+        for response in self.responses.groups[category]:
+            terms.extend(WORD.findall(response.lower()))
+        return terms
+
+    def category_weights(self, category):
+        weights = self._category_weights.get(category)
+        if weights is None:
+            weights = self._category_weights[category] = bm25_weights(
+                self.category_terms(category), self.idf, self.average)
+        return weights
+
+    def match_categories(self, text):
+        """Return every category matching lowercase text, best first"""
+        found = set()
+        phrases = self.phrases
+        terms = []
+        for match in WORD.finditer(text):
+            word = match.group()
+            terms.append(word)
+            entries = phrases.get(word)
+            if entries is None:
+                continue
+            start = match.start()
+            for keyword, category in entries:
+                if category in found:
+                    continue
+                if len(keyword) == len(word):
+                    found.add(category)
+                else:
+                    end = start + len(keyword)
+                    if text.startswith(keyword, start) and not WORD_CHAR.match(text, end):
+                        found.add(category)
+        for pattern, category in self.residual:
+            if category not in found and pattern.search(text):
+                found.add(category)
+        if len(found) < 2:
+            return list(found)
+
+        terms = set(terms)
+
+        def rank(category):
+            weights = self.category_weights(category)
+            score = sum(weights.get(term, 0.0) for term in terms)
+            return -score, self.order[category]
+
+        return sorted(found, key=rank)
+
+    def category_response(self, category, text, rng=random):
+        """Return the best response of a category for lowercase text"""
+        return self.responses.best(category, set(WORD.findall(text)), rng)
+
+    def topic_response(self, topic, text, rng=random):
+        """Return the best advanced-topic response for lowercase text"""
+        return self.topic_responses.best(topic, set(WORD.findall(text)), rng)
@@ -0,0 +1,347 @@
+"""Vectorized VADER scoring for batches of messages.
+
+``BatchSentimentScorer`` reproduces NLTK's
+``SentimentIntensityAnalyzer.polarity_scores`` for many texts at once. Each
+batch is tokenized into index arrays over the distinct words it contains,
+and the valence rules (caps emphasis, boosters, negation, "never so",
+"least", "but", punctuation emphasis) and the compound normalization run as
+NumPy array operations over every token of the batch.
+
+NumPy is optional; without it the scorer falls back to calling
+``polarity_scores`` once per text.
+
+Score an exported conversation from the command line:
+
+    python chatbot_sentiment.py chat.jsonl.gz --output scored.jsonl.gz
+"""
+import argparse
+import json
+import string
+import sys
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Per-word features, one row per distinct word of a batch
+(F_VALENCE, F_IN_LEXICON, F_BOOSTER, F_NEGATED, F_UPPER, F_NEVER, F_SO_THIS,
+ F_LEAST, F_AT_VERY, F_BUT, F_KIND, F_OF, F_BIGRAM_FIRST, F_BIGRAM_SECOND,
+ F_JUST, F_ENOUGH) = range(16)
+FEATURES = 16
+
+_PUNCTUATION = frozenset(string.punctuation)
+_REMOVE_PUNCTUATION = str.maketrans('', '', string.punctuation)
+
+
+class BatchSentimentScorer:
+    """Score many texts with the lexicon and constants of a SentimentIntensityAnalyzer"""
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.constants = constants = analyzer.constants
+        self.lexicon = analyzer.lexicon
+        self.punc_list = frozenset(constants.PUNC_LIST)
+        self.idioms = constants.SPECIAL_CASE_IDIOMS
+
+    def polarity_scores(self, texts):
+        """Return a polarity_scores() dict for each text"""
+        texts = list(texts)
+        if not NUMPY_AVAILABLE:
+            return [self.analyzer.polarity_scores(text) for text in texts]
+        scores = self.score(texts)
+        return [{'neg': neg, 'neu': neu, 'pos': pos, 'compound': compound}
+                for neg, neu, pos, compound in zip(*(scores[key].tolist()
+                                                     for key in ('neg', 'neu', 'pos', 'compound')))]
+
+    def words(self, text):
+        """Split text the way VADER's SentiText does"""
+        words_only = {word for word in text.translate(_REMOVE_PUNCTUATION).split() if len(word) > 1}
+        words = []
+        for word in text.split():
+            if len(word) <= 1:
+                continue
+            if word[-1] in _PUNCTUATION or word[0] in _PUNCTUATION:
+                # Drop one trailing (or else leading) punctuation mark like "!!"
+                # when what is left is a word of the text
+                stem = word.rstrip(string.punctuation)
+                if word[len(stem):] in self.punc_list and stem in words_only:
+                    word = stem
+                else:
+                    stem = word.lstrip(string.punctuation)
+                    if word[:len(word) - len(stem)] in self.punc_list and stem in words_only:
+                        word = stem
+            words.append(word)
+        return words
+
+    def word_features(self, word):
+        constants = self.constants
+        lower = word.lower()
+        valence = self.lexicon.get(lower)
+        return (
+            valence or 0.0,
+            valence is not None,
+            constants.BOOSTER_DICT.get(lower, 0.0),
+            lower in constants.NEGATE or "n't" in lower,
+            word.isupper(),
+            word == 'never',
+            word in ('so', 'this'),
+            lower == 'least',
+            lower in ('at', 'very'),
+            lower == 'but',
+            lower == 'kind',
+            lower == 'of',
+            # "kind of" / "sort of" / "just enough" as written, for the bigram booster check
+            word in ('kind', 'sort'),
+            word == 'of',
+            word == 'just',
+            word == 'enough',
+        )
+
+    def tokenize(self, texts):
+        """Return (word ids, message ids, first-occurrence positions, vocabulary, words)
+
+        Positions are indexes into the flattened token arrays; VADER scores a
+        repeated word using the context of its first occurrence.
+        """
+        vocabulary = {}
+        word_ids, message_ids, first_positions, words = [], [], [], []
+        for m, text in enumerate(texts):
+            first = {}
+            for word in self.words(text):
+                position = len(word_ids)
+                word_ids.append(vocabulary.setdefault(word, len(vocabulary)))
+                message_ids.append(m)
+                first_positions.append(first.setdefault(word, position))
+                words.append(word)
+        return (np.array(word_ids, dtype=np.intp), np.array(message_ids, dtype=np.intp),
+                np.array(first_positions, dtype=np.intp), vocabulary, words)
+
+    def score(self, texts):
+        """Return arrays 'neg', 'neu', 'pos' and 'compound' for the texts"""
+        constants = self.constants
+        count = len(texts)
+        word_ids, message_ids, first_positions, vocabulary, words = self.tokenize(texts)
+        table = np.array([self.word_features(word) for word in vocabulary], dtype=np.float64).reshape(-1, FEATURES)
+        features = table[word_ids]
+        n = len(word_ids)
+
+        # Position of each token inside its message
+        lengths = np.bincount(message_ids, minlength=count)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        index = np.arange(n)
+        position = index - starts[message_ids]
+
+        flags = features.astype(bool)
+
+        def column(feature, shift=0):
+            """Feature of the token ``shift`` places earlier (negative: later); 0 outside the message"""
+            values = (features if feature in (F_VALENCE, F_BOOSTER) else flags)[:, feature]
+            if shift == 0:
+                return values
+            shifted = np.zeros(n, dtype=values.dtype)
+            if shift > 0:
+                shifted[shift:] = values[:-shift]
+                valid = position >= shift
+            else:
+                shifted[:shift] = values[-shift:]
+                valid = position < lengths[message_ids] + shift
+            return np.where(valid, shifted, shifted.dtype.type(0))
+
+        # Some but not all words of the message in caps
+        upper_counts = np.bincount(message_ids, weights=features[:, F_UPPER], minlength=count)
+        cap_diff = ((upper_counts > 0) & (upper_counts < lengths))[message_ids]
+
+        in_lexicon = column(F_IN_LEXICON)
+        skip = (column(F_BOOSTER) != 0) | (column(F_KIND) & column(F_OF, -1))
+        valence = column(F_VALENCE).copy()
+        caps = in_lexicon & column(F_UPPER) & cap_diff
+        valence += np.where(caps, np.where(valence > 0, constants.C_INCR, -constants.C_INCR), 0)
+
+        for start_i, damping in ((0, 1.0), (1, 0.95), (2, 0.9)):
+            shift = start_i + 1
+            active = in_lexicon & (position > start_i) & ~column(F_IN_LEXICON, shift)
+            booster = column(F_BOOSTER, shift)
+            scalar = np.where(valence < 0, -booster, booster)
+            scalar += np.where((booster != 0) & column(F_UPPER, shift) & cap_diff,
+                               np.where(valence > 0, constants.C_INCR, -constants.C_INCR), 0)
+            valence = np.where(active, valence + scalar * damping, valence)
+
+            negated = column(F_NEGATED, shift)
+            if start_i == 0:
+                valence = np.where(active & negated, valence * constants.N_SCALAR, valence)
+            elif start_i == 1:
+                never_so = column(F_NEVER, 2) & column(F_SO_THIS, 1)
+                valence = np.where(active & never_so, valence * 1.5,
+                                   np.where(active & ~never_so & negated, valence * constants.N_SCALAR, valence))
+            else:
+                never_so = (column(F_NEVER, 3) & column(F_SO_THIS, 2)) | column(F_SO_THIS, 1)
+                valence = np.where(active & never_so, valence * 1.25,
+                                   np.where(active & ~never_so & negated, valence * constants.N_SCALAR, valence))
+                valence = self._idioms(valence, active, texts, words, message_ids, position, lengths)
+                bigram = ((column(F_BIGRAM_FIRST, 3) & column(F_BIGRAM_SECOND, 2))
+                          | (column(F_JUST, 3) & column(F_ENOUGH, 2))
+                          | (column(F_BIGRAM_FIRST, 2) & column(F_BIGRAM_SECOND, 1))
+                          | (column(F_JUST, 2) & column(F_ENOUGH, 1)))
+                valence = np.where(active & bigram, valence + constants.B_DECR, valence)
+
+        # "least" negates unless it follows "at" or "very"
+        least = in_lexicon & column(F_LEAST, 1) & ~column(F_IN_LEXICON, 1)
+        least &= (position == 1) | ~column(F_AT_VERY, 2)
+        valence = np.where(least, valence * constants.N_SCALAR, valence)
+
+        valence = np.where(in_lexicon & ~skip, valence, 0.0)
+        sentiments = valence[first_positions]
+
+        # Words before the first "but" count half, words after it one and a half
+        is_but = column(F_BUT)
+        first_but = np.full(count, n, dtype=np.intp)
+        np.minimum.at(first_but, message_ids[is_but], index[is_but])
+        but_position = first_but[message_ids]
+        has_but = but_position < n
+        sentiments = np.where(has_but & (index < but_position), sentiments * 0.5,
+                              np.where(has_but & (index > but_position), sentiments * 1.5, sentiments))
+
+        return self._scores(texts, sentiments, message_ids, lengths)
+
+    def _idioms(self, valence, active, texts, words, message_ids, position, lengths):
+        """Apply VADER's special-case idioms (rare, so checked per message)"""
+        idioms = self.idioms
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).tolist()
+        # Test the word sequence the checks below see, not the raw text:
+        # dropping one-character tokens can bring an idiom's words together
+        candidates = []
+        for m, (start, length) in enumerate(zip(starts, lengths.tolist())):
+            if length > 3:
+                sequence = ' '.join(words[start:start + length])
+                if any(idiom in sequence for idiom in idioms):
+                    candidates.append(m)
+        if not candidates:
+            return valence
+        valence = valence.copy()
+        for m in candidates:
+            start = starts[m]
+            message = words[start:start + lengths[m]]
+            for i in range(3, len(message)):
+                if not active[start + i]:
+                    continue
+                sequences = (f"{message[i - 1]} {message[i]}",
+                             f"{message[i - 2]} {message[i - 1]} {message[i]}",
+                             f"{message[i - 2]} {message[i - 1]}",
+                             f"{message[i - 3]} {message[i - 2]} {message[i - 1]}",
+                             f"{message[i - 3]} {message[i - 2]}")
+                for sequence in sequences:
+                    if sequence in idioms:
+                        valence[start + i] = idioms[sequence]
+                        break
+                if len(message) - 1 > i and f"{message[i]} {message[i + 1]}" in idioms:
+                    valence[start + i] = idioms[f"{message[i]} {message[i + 1]}"]
+                if len(message) - 1 > i + 1 and f"{message[i]} {message[i + 1]} {message[i + 2]}" in idioms:
+                    valence[start + i] = idioms[f"{message[i]} {message[i + 1]} {message[i + 2]}"]
+        return valence
+
+    def _scores(self, texts, sentiments, message_ids, lengths):
+        count = len(texts)
+        sum_s = np.bincount(message_ids, weights=sentiments, minlength=count)
+        pos_sum = np.bincount(message_ids, weights=np.where(sentiments > 0, sentiments + 1, 0), minlength=count)
+        neg_sum = np.bincount(message_ids, weights=np.where(sentiments < 0, sentiments - 1, 0), minlength=count)
+        neu_count = np.bincount(message_ids, weights=sentiments == 0, minlength=count)
+
+        # Emphasis from up to four '!' and two or more '?'
+        exclamations = np.minimum(np.array([text.count('!') for text in texts], dtype=np.float64), 4)
+        questions = np.array([text.count('?') for text in texts], dtype=np.float64)
+        amplifier = exclamations * 0.292 + np.where(questions > 3, 0.96,
+                                                    np.where(questions > 1, questions * 0.18, 0))
+
+        sum_s = sum_s + np.sign(sum_s) * amplifier
+        compound = sum_s / np.sqrt(sum_s * sum_s + 15)
+
+        neg_abs = np.abs(neg_sum)
+        pos_sum, neg_sum = (np.where(pos_sum > neg_abs, pos_sum + amplifier, pos_sum),
+                            np.where(pos_sum < neg_abs, neg_sum - amplifier, neg_sum))
+        total = pos_sum + np.abs(neg_sum) + neu_count
+        # Messages without words score all zeros
+        scored = (lengths > 0) & (total > 0)
+        total = np.where(scored, total, 1)
+
+        def rounded(values, digits):
+            # Python's round, as VADER uses: np.round scales first and can
+            # land on the other side of a half (0.2625 -> 0.262)
+            return np.array([round(value, digits) for value in values.tolist()], dtype=np.float64)
+
+        def share(values):
+            return rounded(np.where(scored, np.abs(values / total), 0.0), 3)
+
+        return {
+            'neg': share(neg_sum),
+            'neu': share(neu_count),
+            'pos': share(pos_sum),
+            'compound': rounded(np.where(scored, compound, 0.0), 4),
+        }
+
+
+def score_export(path, scorer, output=None, batch_size=10000):
+    """Re-score the user messages of a JSONL export in batches
+
+    Writes the export with fresh 'mood' fields to ``output`` when given and
+    returns summary counts using the statistics thresholds (±0.1).
+    """
+    from chatbot_storage import iter_export, open_export
+
+    summary = {'messages': 0, 'positive': 0, 'negative': 0, 'neutral': 0, 'compound_sum': 0.0}
+    out = open_export(output, 'w') if output else None
+
+    def flush(batch):
+        for record, mood in zip(batch, scorer.polarity_scores(record['user'] for record in batch)):
+            record['mood'] = mood
+            compound = mood['compound']
+            summary['messages'] += 1
+            summary['compound_sum'] += compound
+            summary['positive' if compound > 0.1 else 'negative' if compound < -0.1 else 'neutral'] += 1
+            if out is not None:
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    try:
+        batch = []
+        for record in iter_export(path):
+            if record.get('type') != 'turn':
+                if out is not None:
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        flush(batch)
+    finally:
+        if out is not None:
+            out.close()
+    return summary
+
+
+def main():
+    """Score an exported conversation from the command line"""
+    parser = argparse.ArgumentParser(description="Re-score the messages of a JSONL chat export with VADER")
+    parser.add_argument('export', help=".jsonl or .jsonl.gz export")
+    parser.add_argument('--output', help="write the export with updated moods here")
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    try:
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        analyzer = SentimentIntensityAnalyzer()
+    except (ImportError, LookupError) as e:
+        sys.exit(f"VADER is not available: {e}")
+    scorer = BatchSentimentScorer(analyzer)
+
+    summary = score_export(args.export, scorer, args.output, args.batch_size)
+    messages = summary['messages']
+    average = summary['compound_sum'] / messages if messages else 0.0
+    print(f"Messages: {messages}")
+    print(f"Positive: {summary['positive']}  Negative: {summary['negative']}  Neutral: {summary['neutral']}")
+    print(f"Average compound: {average:.4f}")
+
+
+if __name__ == "__main__":
+    main()
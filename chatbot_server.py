@@ -0,0 +1,457 @@
+"""asyncio HTTP + WebSocket front-end for the chatbot engine.
+
+Each WebSocket connection and each HTTP session id gets its own session
+state (history, user profile and bot settings) on top of one shared
+compiled knowledge base. Message analysis and reply generation run on a
+thread pool so the event loop only handles I/O, which lets one process
+hold thousands of mostly idle connections.
+
+Only the standard library is used. Run it with:
+
+    python chatbot_server.py --port 8765 [--knowledge knowledge.json]
+
+With --knowledge the knowledge base is read from JSON files (see
+chatbot_knowledge.py) and reloaded whenever they change.
+
+Endpoints:
+    GET  /health   server status as JSON
+    GET  /timings  per-stage latency percentiles (unless --no-timings)
+    POST /chat     {"message": "...", "session": "<id>"} -> {"session": ..., "response": ...}
+                   "message" must be a non-empty string. An optional
+                   "settings" object may set personality, response_style,
+                   learning_mode and mood_detection; any other key or
+                   value is a 400 (an error frame on /ws)
+    GET  /ws       WebSocket; send text (or {"message": ...}) and receive
+                   {"response": ...} for each message
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from chatbot_engine import ChatBotEngine
+from chatbot_knowledge import KnowledgeReloader, load_knowledge
+from chatbot_metrics import StageTimings
+from chatbot_responses import PERSONALITIES, RESPONSE_STYLES
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC11B85'
+
+HTTP_REASONS = {
+    101: 'Switching Protocols',
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+}
+
+# WebSocket opcodes
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+# Settings a client may change, and the values each accepts
+SETTING_VALUES = {
+    'personality': PERSONALITIES,
+    'response_style': RESPONSE_STYLES,
+    'learning_mode': (True, False),
+    'mood_detection': (True, False),
+}
+
+MAX_SESSION_ID = 128
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=''):
+        super().__init__(message or HTTP_REASONS.get(status, 'Error'))
+        self.status = status
+
+
+def validate_settings(settings):
+    """Return client-supplied settings as a dict, or raise HTTPError(400)"""
+    if settings is None:
+        return {}
+    if not isinstance(settings, dict):
+        raise HTTPError(400, '"settings" must be an object')
+    for key, value in settings.items():
+        allowed = SETTING_VALUES.get(key)
+        if allowed is None:
+            raise HTTPError(400, f'Unknown setting {key!r}')
+        # bool is checked by type, so 1 and 0 are not taken for True and False
+        if isinstance(allowed[0], bool):
+            if not isinstance(value, bool):
+                raise HTTPError(400, f'{key!r} must be true or false')
+        elif not isinstance(value, str) or value not in allowed:
+            raise HTTPError(400, f'{key!r} must be one of {", ".join(allowed)}')
+    return settings
+
+
+class ChatSession:
+    """One user's engine plus the lock that keeps their turns in order"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class ChatServer:
+    """Serve the chatbot over HTTP and WebSocket from one event loop"""
+
+    def __init__(self, host='127.0.0.1', port=8765, workers=4, engine=None,
+                 max_message_size=64 * 1024, session_ttl=30 * 60, timings=True,
+                 knowledge_path=None, reload_interval=2.0):
+        self.host = host
+        self.port = port
+        self.max_message_size = max_message_size
+        self.session_ttl = session_ttl
+        # Template engine; every session shares its compiled knowledge
+        # and its stage timings
+        knowledge = load_knowledge(knowledge_path) if knowledge_path else None
+        self.engine = engine or ChatBotEngine(timings=StageTimings() if timings else None,
+                                              knowledge=knowledge)
+        self.reloader = None
+        if knowledge_path:
+            self.reloader = KnowledgeReloader(knowledge_path, self.engine.set_knowledge, reload_interval,
+                                              source_hash=self.engine.knowledge.source_hash)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chatbot-server')
+        self.sessions = {}  # HTTP session id -> ChatSession
+        self.connections = 0
+        self.messages = 0
+        self.server = None
+        self._prune_task = None
+        self._writers = set()
+
+    async def start(self):
+        """Start listening; returns once the socket is bound"""
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        if self.port == 0:
+            self.port = self.server.sockets[0].getsockname()[1]
+        self._prune_task = asyncio.ensure_future(self.prune_sessions())
+        if self.reloader is not None:
+            self.reloader.start()
+        return self
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self._prune_task is not None:
+            self._prune_task.cancel()
+        if self.reloader is not None:
+            self.reloader.stop()
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    def new_session(self):
+        return ChatSession(self.engine.new_session())
+
+    async def respond(self, session, text, settings=None):
+        """Run one turn for a session on the thread pool
+
+        ``settings`` must have passed validate_settings.
+        """
+        async with session.lock:
+            session.last_used = time.monotonic()
+            if settings:
+                session.engine.bot_settings.update(settings)
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self.executor, session.engine.respond, text)
+            self.messages += 1
+            return response
+
+    def knowledge_status(self):
+        status = {'source_hash': self.engine.knowledge.source_hash}
+        if self.reloader is not None:
+            status.update(reloads=self.reloader.reloads, error=self.reloader.error)
+        return status
+
+    async def prune_sessions(self):
+        """Drop HTTP sessions that have been idle longer than session_ttl"""
+        while True:
+            await asyncio.sleep(min(60, self.session_ttl))
+            cutoff = time.monotonic() - self.session_ttl
+            for session_id in [key for key, session in self.sessions.items()
+                               if session.last_used < cutoff and not session.lock.locked()]:
+                del self.sessions[session_id]
+
+    # HTTP
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except HTTPError as e:
+                    await self.send_json(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                if path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                    await self.handle_websocket(reader, writer, headers)
+                    break
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    status, payload = await self.route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception:
+                    traceback.print_exc()
+                    status, payload = 500, {'error': HTTP_REASONS[500]}
+                await self.send_json(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Server shutdown; end quietly instead of logging every connection
+            pass
+        finally:
+            self.connections -= 1
+            self._writers.discard(writer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def read_request(self, reader):
+        """Return (method, path, headers, body) or None at end of stream"""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(413)
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, path, _ = lines[0].split(' ', 2)
+        except ValueError:
+            raise HTTPError(400)
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0) or 0)
+        except ValueError:
+            raise HTTPError(400, 'Invalid Content-Length')
+        if length < 0:
+            raise HTTPError(400, 'Invalid Content-Length')
+        if length > self.max_message_size:
+            raise HTTPError(413)
+        body = await reader.readexactly(length) if length else b''
+        return method, path.split('?', 1)[0], headers, body
+
+    async def route(self, method, path, body):
+        if path == '/health':
+            return 200, {
+                'status': 'ok',
+                'connections': self.connections,
+                'sessions': len(self.sessions),
+                'messages': self.messages,
+                'nlp': self.engine.nlp_status(),
+                'knowledge': self.knowledge_status()
+            }
+        if path == '/timings':
+            if self.engine.timings is None:
+                raise HTTPError(404, 'Timings are turned off')
+            return 200, self.engine.timings.summary()
+        if path == '/chat':
+            if method != 'POST':
+                raise HTTPError(405)
+            try:
+                data = json.loads(body.decode('utf-8'))
+                text = data['message']
+            except (ValueError, KeyError, TypeError):
+                raise HTTPError(400, 'Expected JSON with a "message" field')
+            if not isinstance(text, str):
+                raise HTTPError(400, '"message" must be a string')
+            text = text.strip()
+            if not text:
+                raise HTTPError(400, 'Empty message')
+            settings = validate_settings(data.get('settings'))
+
+            session_id = data.get('session') or uuid.uuid4().hex
+            if not isinstance(session_id, str) or len(session_id) > MAX_SESSION_ID:
+                raise HTTPError(400, f'"session" must be a string of at most {MAX_SESSION_ID} characters')
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = self.new_session()
+            response = await self.respond(session, text, settings)
+            return 200, {'session': session_id, 'response': response}
+        raise HTTPError(404)
+
+    async def send_json(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    # WebSocket
+
+    async def handle_websocket(self, reader, writer, headers):
+        key = headers.get('sec-websocket-key')
+        if not key:
+            await self.send_json(writer, 400, {'error': 'Missing Sec-WebSocket-Key'}, keep_alive=False)
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+        writer.write((f"HTTP/1.1 101 {HTTP_REASONS[101]}\r\n"
+                      "Upgrade: websocket\r\n"
+                      "Connection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+
+        # The engine is only created once the connection sends a message,
+        # so idle connections cost no more than their socket
+        session = None
+        while True:
+            message = await self.read_message(reader, writer)
+            if message is None:
+                break
+
+            settings = None
+            text = message
+            if message.startswith('{'):
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    # Not JSON after all; answer it as plain text
+                    data = None
+                if data is not None:
+                    text = data.get('message', '')
+                    settings = data.get('settings')
+                    if not isinstance(text, str):
+                        await self.send_frame(writer, OP_TEXT, json.dumps({'error': '"message" must be a string'}).encode('utf-8'))
+                        continue
+            try:
+                settings = validate_settings(settings)
+            except HTTPError as e:
+                await self.send_frame(writer, OP_TEXT, json.dumps({'error': str(e)}).encode('utf-8'))
+                continue
+            text = text.strip()
+            if not text:
+                await self.send_frame(writer, OP_TEXT, json.dumps({'error': 'Empty message'}).encode('utf-8'))
+                continue
+
+            if session is None:
+                session = self.new_session()
+            try:
+                response = await self.respond(session, text, settings)
+            except Exception:
+                traceback.print_exc()
+                await self.send_frame(writer, OP_TEXT, json.dumps({'error': HTTP_REASONS[500]}).encode('utf-8'))
+                continue
+            await self.send_frame(writer, OP_TEXT, json.dumps({'response': response}, ensure_ascii=False).encode('utf-8'))
+
+    async def read_message(self, reader, writer):
+        """Return the next text message, or None once the socket closes"""
+        fragments = []
+        size = 0
+        while True:
+            try:
+                first, second = await reader.readexactly(2)
+            except asyncio.IncompleteReadError:
+                return None
+            fin = first & 0x80
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack('!H', await reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack('!Q', await reader.readexactly(8))[0]
+
+            size += length
+            if size > self.max_message_size:
+                await self.send_frame(writer, OP_CLOSE, struct.pack('!H', 1009))
+                return None
+
+            mask = await reader.readexactly(4) if second & 0x80 else None
+            payload = await reader.readexactly(length)
+            if mask and length:
+                key = (mask * (length // 4 + 1))[:length]
+                payload = (int.from_bytes(payload, 'big') ^ int.from_bytes(key, 'big')).to_bytes(length, 'big')
+
+            if opcode == OP_CLOSE:
+                await self.send_frame(writer, OP_CLOSE, payload[:2])
+                return None
+            if opcode == OP_PING:
+                await self.send_frame(writer, OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode not in (OP_TEXT, OP_CONTINUATION):
+                # Binary frames are not supported
+                await self.send_frame(writer, OP_CLOSE, struct.pack('!H', 1003))
+                return None
+
+            fragments.append(payload)
+            if fin:
+                try:
+                    return b''.join(fragments).decode('utf-8')
+                except UnicodeDecodeError:
+                    await self.send_frame(writer, OP_CLOSE, struct.pack('!H', 1007))
+                    return None
+
+    async def send_frame(self, writer, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        writer.write(header + payload)
+        await writer.drain()
+
+
+def main():
+    """Run the chatbot server from the command line"""
+    parser = argparse.ArgumentParser(description="Serve the chatbot over HTTP and WebSocket")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=4, help="threads running analysis and replies")
+    parser.add_argument('--no-timings', action='store_true', help="don't keep per-stage latency histograms")
+    parser.add_argument('--knowledge', metavar='PATH', help="knowledge base JSON file or directory, reloaded on change")
+    args = parser.parse_args()
+
+    server = ChatServer(args.host, args.port, args.workers, timings=not args.no_timings,
+                        knowledge_path=args.knowledge)
+    print(f"ChatBot server listening on http://{args.host}:{args.port} (WebSocket: /ws)")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
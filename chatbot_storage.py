@@ -0,0 +1,570 @@
+"""Compact session state for the chatbot engine.
+
+Turns and mood samples are slotted records with epoch-float timestamps and
+sentiment held as four floats instead of per-turn dicts. ``TurnHistory``
+keeps only the most recent turns in memory and spills older ones to a
+JSONL file, so each session stays within a known memory budget.
+``TopicCounter`` and ``MoodHistory`` keep their statistics (top topics,
+mood sum) up to date as samples arrive.
+
+The export helpers stream a session to disk one turn at a time (plain or
+gzip-compressed), and ``iter_export`` reads such files back the same way.
+
+``SessionJournal`` persists a session as an append-only journal plus
+periodic compact snapshots so it can be resumed after a restart or crash.
+"""
+import datetime
+import gzip
+import itertools
+import json
+import os
+import tempfile
+import threading
+import weakref
+from collections import deque
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class Sentiment:
+    """VADER polarity scores as four floats"""
+    __slots__ = ('neg', 'neu', 'pos', 'compound')
+
+    def __init__(self, neg, neu, pos, compound):
+        self.neg = neg
+        self.neu = neu
+        self.pos = pos
+        self.compound = compound
+
+    @classmethod
+    def from_scores(cls, scores):
+        """Build from a polarity_scores() dict; None stays None"""
+        if scores is None:
+            return None
+        return cls(scores['neg'], scores['neu'], scores['pos'], scores['compound'])
+
+    def __getitem__(self, key):
+        # Lets older code keep reading mood['compound']
+        return getattr(self, key)
+
+    def as_dict(self):
+        return {'neg': self.neg, 'neu': self.neu, 'pos': self.pos, 'compound': self.compound}
+
+
+class Turn:
+    """One user message and the bot's reply"""
+    __slots__ = ('user', 'bot', 'timestamp', 'mood')
+
+    def __init__(self, user, timestamp, mood=None, bot=None):
+        self.user = user
+        self.timestamp = timestamp  # seconds since the epoch
+        self.mood = mood  # Sentiment or None
+        self.bot = bot
+
+    @property
+    def datetime(self):
+        return datetime.datetime.fromtimestamp(self.timestamp)
+
+    def to_dict(self):
+        """Export form, matching the original per-turn dicts"""
+        data = {
+            'user': self.user,
+            'timestamp': str(self.datetime),
+            'mood': self.mood.as_dict() if self.mood is not None else None
+        }
+        if self.bot is not None:
+            data['bot'] = self.bot
+        return data
+
+    def to_row(self):
+        """Compact list form used for spill files"""
+        mood = self.mood
+        if mood is None:
+            return [self.user, self.bot, self.timestamp]
+        return [self.user, self.bot, self.timestamp, mood.neg, mood.neu, mood.pos, mood.compound]
+
+    @classmethod
+    def from_row(cls, row):
+        mood = Sentiment(*row[3:7]) if len(row) > 3 else None
+        return cls(row[0], row[2], mood, row[1])
+
+
+class MoodEntry:
+    """A sentiment sample kept in the user profile"""
+    __slots__ = ('timestamp', 'sentiment')
+
+    def __init__(self, timestamp, sentiment):
+        self.timestamp = timestamp
+        self.sentiment = sentiment
+
+    def to_dict(self):
+        return {
+            'timestamp': str(datetime.datetime.fromtimestamp(self.timestamp)),
+            'sentiment': self.sentiment.as_dict()
+        }
+    
+    def to_row(self):
+        sentiment = self.sentiment
+        return [self.timestamp, sentiment.neg, sentiment.neu, sentiment.pos, sentiment.compound]
+    
+    @classmethod
+    def from_row(cls, row):
+        return cls(row[0], Sentiment(*row[1:5]))
+
+
+class TurnHistory:
+    """Ring buffer of recent turns that spills older turns to disk
+
+    ``len()`` and indexing cover the turns held in memory; ``total`` counts
+    every turn of the session and ``iter_all()`` replays spilled turns
+    before the in-memory ones. With ``limit=None`` nothing is spilled.
+    """
+
+    def __init__(self, limit=500, spill_dir=None, spill_batch=32):
+        self.limit = limit
+        self.spill_dir = spill_dir
+        self.spill_batch = spill_batch
+        self.total = 0
+        self.spilled = 0
+        self.first_timestamp = None
+        self.spill_path = None
+        self._turns = deque()
+        self._pending = []
+        self._cleanup = None
+
+    def append(self, turn):
+        if self.first_timestamp is None:
+            self.first_timestamp = turn.timestamp
+        self._turns.append(turn)
+        self.total += 1
+        if self.limit is not None and len(self._turns) > self.limit:
+            self._pending.append(self._turns.popleft())
+            if len(self._pending) >= self.spill_batch:
+                self.flush()
+
+    def flush(self):
+        """Write turns waiting to be spilled"""
+        if not self._pending:
+            return
+        if self.spill_path is None:
+            fd, self.spill_path = tempfile.mkstemp(prefix='chatbot-history-', suffix='.jsonl',
+                                                   dir=self.spill_dir)
+            os.close(fd)
+            # Removed with the history even if close() is never called
+            self._cleanup = weakref.finalize(self, _remove_file, self.spill_path)
+        with open(self.spill_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(turn.to_row(), ensure_ascii=False) + '\n'
+                            for turn in self._pending))
+        self.spilled += len(self._pending)
+        self._pending = []
+
+    def iter_all(self):
+        """Return an iterator over every turn of the session, oldest first
+
+        The in-memory part is copied when this is called and only lines
+        already written to the spill file are read, so the iterator can be
+        consumed on another thread while new turns arrive.
+        """
+        spill_path, spilled = self.spill_path, self.spilled
+        pending, turns = list(self._pending), list(self._turns)
+        return self._iter_snapshot(spill_path, spilled, pending, turns)
+    
+    @staticmethod
+    def _iter_snapshot(spill_path, spilled, pending, turns):
+        if spill_path is not None and spilled:
+            with open(spill_path, encoding='utf-8') as f:
+                for _, line in zip(range(spilled), f):
+                    yield Turn.from_row(json.loads(line))
+        yield from pending
+        yield from turns
+
+    @property
+    def available(self):
+        """Number of turns iter_all() yields; a restored session may lack older ones"""
+        return self.spilled + len(self._pending) + len(self._turns)
+
+    def read(self, start, stop):
+        """Return the turns at positions start..stop-1 of iter_all()
+
+        Only the requested lines of the spill file are parsed.
+        """
+        spill_path, spilled = self.spill_path, self.spilled
+        turns = []
+        if spill_path is not None and start < spilled:
+            with open(spill_path, encoding='utf-8') as f:
+                for index, line in enumerate(itertools.islice(f, min(stop, spilled))):
+                    if index >= start:
+                        turns.append(Turn.from_row(json.loads(line)))
+        memory = list(self._pending) + list(self._turns)
+        turns.extend(memory[max(0, start - spilled):max(0, stop - spilled)])
+        return turns
+
+    def recent(self):
+        """Return the turns that have not been written to the spill file"""
+        return list(self._pending) + list(self._turns)
+    
+    def restore(self, turns, total, first_timestamp):
+        """Reset to the given recent turns of a session with ``total`` turns"""
+        self.clear()
+        for turn in turns:
+            self.append(turn)
+        self.total = total
+        self.first_timestamp = first_timestamp
+    
+    def clear(self):
+        self._turns.clear()
+        self._pending = []
+        self.total = 0
+        self.spilled = 0
+        self.first_timestamp = None
+        self.close()
+
+    def close(self):
+        """Delete the spill file"""
+        if self._cleanup is not None:
+            self._cleanup()
+            self._cleanup = None
+        self.spill_path = None
+
+    def __len__(self):
+        return len(self._turns)
+
+    def __bool__(self):
+        return self.total > 0
+
+    def __iter__(self):
+        return iter(self._turns)
+
+    def __getitem__(self, index):
+        return self._turns[index]
+
+
+class TopicCounter(dict):
+    """Topic mention counts that keep their ``k`` most mentioned topics ranked
+
+    Reads behave like ``defaultdict(int)``; counts must be changed through
+    ``add`` so the ranking stays current. Ties rank in first-mention order,
+    as a stable sort of the counts would.
+    """
+
+    def __init__(self, counts=(), k=5):
+        super().__init__()
+        self.k = k
+        self._order = {}  # topic -> first-mention rank
+        self._top = []
+        for topic, count in dict(counts).items():
+            self.add(topic, count)
+
+    def __missing__(self, topic):
+        return 0
+
+    def _rank(self, topic):
+        return (-self[topic], self._order[topic])
+
+    def add(self, topic, count=1):
+        if topic not in self._order:
+            self._order[topic] = len(self._order)
+        self[topic] = self.get(topic, 0) + count
+
+        top = self._top
+        if topic not in top:
+            if len(top) < self.k:
+                top.append(topic)
+            elif self._rank(topic) < self._rank(top[-1]):
+                top[-1] = topic
+            else:
+                return
+        # Counts only grow, so the topic can only move up
+        i = top.index(topic)
+        while i and self._rank(topic) < self._rank(top[i - 1]):
+            top[i] = top[i - 1]
+            i -= 1
+        top[i] = topic
+
+    def top(self, n=None):
+        """Return the (topic, count) pairs of the most mentioned topics"""
+        return [(topic, self[topic]) for topic in self._top[:n]]
+
+
+class MoodHistory(deque):
+    """Bounded deque of MoodEntry with a running sum of compound scores"""
+
+    def __init__(self, entries=(), maxlen=50):
+        super().__init__(maxlen=maxlen)
+        self.compound_sum = 0.0
+        self.extend(entries)
+
+    def append(self, entry):
+        if len(self) == self.maxlen:
+            self.compound_sum -= self[0].sentiment.compound
+        super().append(entry)
+        self.compound_sum += entry.sentiment.compound
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def clear(self):
+        super().clear()
+        self.compound_sum = 0.0
+
+    @property
+    def average(self):
+        """Mean compound score, or None when empty"""
+        return self.compound_sum / len(self) if self else None
+
+
+def open_export(path, mode):
+    """Open an export file as text, gzip-compressed when it ends in .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _report(progress, count, total, every=256):
+    if progress is not None and (count % every == 0 or count == total):
+        progress(count, total)
+
+
+def export_jsonl(path, turns, header, total=None, progress=None):
+    """Stream a header record and then one JSON record per turn
+
+    ``progress(done, total)`` is called every few hundred turns.
+    """
+    count = 0
+    with open_export(path, 'w') as f:
+        f.write(json.dumps(dict(header, type='header'), ensure_ascii=False) + '\n')
+        for turn in turns:
+            record = turn.to_dict()
+            record['type'] = 'turn'
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+            _report(progress, count, total)
+    return count
+
+
+def export_json(path, turns, header, total=None, progress=None):
+    """Stream the original single-document JSON layout without building it in memory"""
+    count = 0
+    with open_export(path, 'w') as f:
+        f.write('{\n  "conversation": [')
+        for turn in turns:
+            f.write(',\n    ' if count else '\n    ')
+            f.write(json.dumps(turn.to_dict(), ensure_ascii=False))
+            count += 1
+            _report(progress, count, total)
+        f.write('\n  ]')
+        for key, value in header.items():
+            f.write(f',\n  {json.dumps(key)}: ')
+            f.write(json.dumps(value, ensure_ascii=False, default=str))
+        f.write('\n}\n')
+    return count
+
+
+def export_text(path, turns, header, total=None, progress=None):
+    """Stream a human-readable transcript"""
+    count = 0
+    with open_export(path, 'w') as f:
+        f.write("🤖 ChatBot Conversation Export\n")
+        f.write(f"Exported: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write("=" * 50 + "\n\n")
+        
+        for msg in turns:
+            timestamp = msg.datetime.strftime('%H:%M:%S')
+            f.write(f"[{timestamp}] You: {msg.user}\n")
+            if msg.bot is not None:
+                f.write(f"[{timestamp}] ChatBot: {msg.bot}\n")
+            f.write("\n")
+            count += 1
+            _report(progress, count, total)
+        
+        latency = header.get('latency')
+        if latency:
+            f.write("=" * 50 + "\n")
+            f.write(f"{'Stage latency (ms)':<20}{'p50':>8}{'p95':>8}{'p99':>8}\n")
+            for stage, data in latency.items():
+                f.write(f"{stage:<20}{data['p50_ms']:8.2f}{data['p95_ms']:8.2f}{data['p99_ms']:8.2f}\n")
+    return count
+
+
+def exporter_for(path):
+    """Pick the export function from the file name"""
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.jsonl'):
+        return export_jsonl
+    if name.endswith('.json'):
+        return export_json
+    return export_text
+
+
+def iter_export(path):
+    """Yield the records of a JSONL export (header first), one at a time
+
+    Gzip-compressed files are detected from their first bytes.
+    """
+    with open(path, 'rb') as raw:
+        compressed = raw.read(2) == b'\x1f\x8b'
+    opener = gzip.open if compressed else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class SessionJournal:
+    """Append-only on-disk journal of a session with compact snapshots
+
+    Records are buffered in memory and written by a background thread every
+    ``flush_interval`` seconds with a single write and fsync, so callers never
+    wait on the disk. After ``snapshot_every`` records the caller hands over
+    its full state, which the same thread writes to ``snapshot.json`` before
+    starting a fresh journal file, so resuming reads one snapshot plus a
+    short journal tail.
+    """
+
+    def __init__(self, directory, flush_interval=1.0, snapshot_every=500):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.snapshot_path = os.path.join(directory, 'snapshot.json')
+        self.records_since_snapshot = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self.generation = 0
+        snapshot = self._read_snapshot()
+        if snapshot is not None:
+            self.generation = snapshot['generation']
+
+        self._buffer = []
+        # State handed to snapshot() and not yet written
+        self._pending_state = None
+        self._buffer_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._file = None
+        self._closed = False
+        self._wake = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name='chatbot-journal', daemon=True)
+        self._flusher.start()
+
+    def journal_path(self, generation):
+        return os.path.join(self.directory, f'journal-{generation}.jsonl')
+
+    def append(self, kind, payload=None):
+        """Buffer one record; it reaches the disk on the next flush"""
+        line = json.dumps([kind, payload], ensure_ascii=False) + '\n'
+        with self._buffer_lock:
+            self._buffer.append(line)
+            self.records_since_snapshot += 1
+
+    @property
+    def snapshot_due(self):
+        return self.records_since_snapshot >= self.snapshot_every
+
+    def flush(self):
+        """Write a pending snapshot, then buffered records with one write and one fsync"""
+        with self._io_lock:
+            with self._buffer_lock:
+                state, self._pending_state = self._pending_state, None
+                lines, self._buffer = self._buffer, []
+            if state is not None:
+                try:
+                    self._write_snapshot(state)
+                except OSError:
+                    with self._buffer_lock:
+                        # Retry on the next flush, unless a newer snapshot replaced it
+                        if self._pending_state is None:
+                            self._pending_state = state
+                            self._buffer[:0] = lines
+                    raise
+            if not lines:
+                return
+            if self._file is None:
+                self._file = open(self.journal_path(self.generation), 'a', encoding='utf-8')
+            self._file.write(''.join(lines))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def snapshot(self, state):
+        """Hand over state (covering every record so far) to be persisted
+
+        The background thread writes it and starts a new journal. Must be
+        called from the thread that appends records, so ``state`` reflects
+        everything that was journaled; it must not be mutated afterwards.
+        """
+        with self._buffer_lock:
+            # Buffered records are already part of state
+            self._buffer = []
+            self._pending_state = state
+            self.records_since_snapshot = 0
+        self._wake.set()
+
+    def _write_snapshot(self, state):
+        """Write state and switch to a new journal; called holding the I/O lock"""
+        old_generation = self.generation
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'generation': old_generation + 1, 'state': state}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self.generation = old_generation + 1
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.journal_path(old_generation))
+        except OSError:
+            pass
+
+    def load(self):
+        """Return (snapshot state or None, [(kind, payload), ...] journal tail)"""
+        snapshot = self._read_snapshot()
+        state = snapshot['state'] if snapshot is not None else None
+        records = []
+        try:
+            with open(self.journal_path(self.generation), encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        kind, payload = json.loads(line)
+                    except ValueError:
+                        # A torn final write from a crash; everything before it is intact
+                        break
+                    records.append((kind, payload))
+        except FileNotFoundError:
+            pass
+        return state, records
+
+    def close(self, state=None):
+        """Stop the flusher; snapshot state if given, then flush"""
+        self._closed = True
+        self._wake.set()
+        self._flusher.join()
+        if state is not None:
+            self.snapshot(state)
+        self.flush()
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError:
+                pass
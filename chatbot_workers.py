@@ -0,0 +1,132 @@
+"""Bounded worker pool for processing chat messages.
+
+Messages are queued per conversation: jobs for the same conversation run
+one at a time in submission order, while different conversations share a
+fixed set of worker threads. The total number of queued jobs is bounded,
+so bursty input gets backpressure instead of an ever-growing pile of
+threads.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+
+class MessageWorkerPool:
+    """Fixed-size thread pool with per-conversation ordering"""
+
+    def __init__(self, workers=2, max_pending=32):
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        self._lanes = {}  # conversation -> deque of jobs, present while active
+        self._ready = deque()  # conversations with a job ready to run
+        self._pending = 0
+        self._closed = False
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"chatbot-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def submit(self, conversation, func, args=(), callback=None, block=True, timeout=None):
+        """Queue ``func(*args)`` for a conversation
+
+        ``callback(result, error)`` is called on the worker thread when the
+        job finishes. Raises ``queue.Full`` when the pool is at capacity and
+        ``block`` is False or ``timeout`` expires.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Worker pool has been shut down")
+
+            if self._pending >= self.max_pending:
+                if not block or not self._cond.wait_for(
+                        lambda: self._pending < self.max_pending or self._closed, timeout):
+                    self.rejected += 1
+                    raise queue.Full
+                if self._closed:
+                    raise RuntimeError("Worker pool has been shut down")
+
+            job = (func, args, callback, time.monotonic())
+            lane = self._lanes.get(conversation)
+            if lane is None:
+                # Idle conversation: schedule it; otherwise it is already
+                # queued or running and will pick this job up in order
+                lane = self._lanes[conversation] = deque()
+                self._ready.append(conversation)
+            lane.append(job)
+
+            self._pending += 1
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, self._pending)
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._ready or self._closed)
+                if not self._ready:
+                    return
+                conversation = self._ready.popleft()
+                func, args, callback, submitted_at = self._lanes[conversation].popleft()
+
+            wait = time.monotonic() - submitted_at
+            result, error = None, None
+            try:
+                result = func(*args)
+            except Exception as e:
+                error = e
+            if callback is not None:
+                try:
+                    callback(result, error)
+                except Exception:
+                    pass
+
+            with self._cond:
+                self._pending -= 1
+                self.completed += 1
+                self.total_wait += wait
+                self.last_wait = wait
+                self.max_wait = max(self.max_wait, wait)
+                if self._lanes[conversation]:
+                    self._ready.append(conversation)
+                else:
+                    del self._lanes[conversation]
+                self._cond.notify_all()
+
+    def metrics(self):
+        """Return queue depth and wait-time counters"""
+        with self._cond:
+            return {
+                'queue_depth': self._pending,
+                'max_queue_depth': self.max_depth,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_wait': self.total_wait / self.completed if self.completed else 0.0,
+                'max_wait': self.max_wait,
+                'last_wait': self.last_wait
+            }
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs; finish queued ones and stop the workers"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
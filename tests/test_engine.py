@@ -0,0 +1,41 @@
+"""Regression tests for the headless engine.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot_engine import ChatBotEngine
+
+
+class NameCaptureTest(unittest.TestCase):
+    """The name is read from the same normalized text the triggers were found in"""
+
+    def captured(self, message):
+        engine = ChatBotEngine()
+        engine.respond(message)
+        return engine.user_profile['name']
+
+    def test_plain(self):
+        self.assertEqual(self.captured("my name is bob"), "Bob")
+
+    def test_leading_whitespace(self):
+        self.assertEqual(self.captured("  my name is bob"), "Bob")
+
+    def test_repeated_whitespace(self):
+        self.assertEqual(self.captured("ok   i am bob"), "Bob")
+        self.assertEqual(self.captured("so   my name is bob"), "Bob")
+        self.assertEqual(self.captured("so,  my name is bob"), "Bob")
+
+    def test_newlines(self):
+        self.assertEqual(self.captured("well,\n\nmy name is Alice"), "Alice")
+
+    def test_extract_name_raw_text(self):
+        self.assertEqual(ChatBotEngine().extract_name("  hi,   i'm   dave  "), "Dave")
+
+
+if __name__ == '__main__':
+    unittest.main()
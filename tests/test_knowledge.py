@@ -0,0 +1,49 @@
+"""Regression tests for knowledge loading and its cache.
+
+    python -m pytest tests
+"""
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot_engine import Knowledge
+from chatbot_knowledge import cache_header, default_cache_path, load_knowledge, read_sources
+
+
+class CorruptCacheTest(unittest.TestCase):
+    """A cache that cannot be used is rebuilt, never returned or raised"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'kb.json')
+        with open(self.path, 'w') as f:
+            json.dump({'intents': {'greetings': {'patterns': [r'\b(hi)\b'], 'responses': ['Hello!']}},
+                       'default': ['Tell me more!']}, f)
+        self.cache_path = default_cache_path(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_bad_protocol(self):
+        with open(self.cache_path, 'wb') as f:
+            f.write(b'\x80\xff not a pickle')
+        self.assertIsInstance(load_knowledge(self.path), Knowledge)
+
+    def test_not_knowledge(self):
+        _, source_hash = read_sources(self.path)
+        with open(self.cache_path, 'wb') as f:
+            pickle.dump(cache_header(source_hash), f)
+            pickle.dump({'not': 'knowledge'}, f)
+        self.assertIsInstance(load_knowledge(self.path), Knowledge)
+        # The rebuilt cache replaced the bad one
+        self.assertIsInstance(load_knowledge(self.path), Knowledge)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+"""The batch scorer must agree with NLTK's SentimentIntensityAnalyzer.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot_sentiment import NUMPY_AVAILABLE, BatchSentimentScorer
+
+try:
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    ANALYZER = SentimentIntensityAnalyzer()
+except (ImportError, LookupError):
+    ANALYZER = None
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE and ANALYZER is not None, "needs NumPy, NLTK and vader_lexicon")
+class BatchSentimentTest(unittest.TestCase):
+
+    def assertMatchesVader(self, texts):
+        scores = BatchSentimentScorer(ANALYZER).polarity_scores(texts)
+        for text, score in zip(texts, scores):
+            self.assertEqual(score, ANALYZER.polarity_scores(text), text)
+
+    def test_idioms_split_by_punctuation(self):
+        # One-character tokens are dropped before the idiom check
+        self.assertMatchesVader(["so the ! bomb movie - happy",
+                                 "I so x the - bomb ! bad the",
+                                 "bad movie very the hand to - mouth I",
+                                 "happy bad hate very very good yeah x right !"])
+
+    def test_rounding(self):
+        self.assertMatchesVader(["cut the mustard good movie",
+                                 "of a the bomb I LOVE movie good good"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""Regression tests for the session journal.
+
+    python -m pytest tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot_storage import SessionJournal
+
+
+class JournalSnapshotTest(unittest.TestCase):
+    """Snapshots are written by the journal's thread and resume like before"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_snapshot_is_deferred(self):
+        journal = SessionJournal(self.directory, flush_interval=60)
+        journal.append('turn', 1)
+        journal.snapshot({'turns': [1]})
+        journal.append('turn', 2)
+        journal.close()
+        state, records = SessionJournal(self.directory).load()
+        self.assertEqual(state, {'turns': [1]})
+        self.assertEqual(records, [('turn', 2)])
+
+    def test_newest_snapshot_wins(self):
+        journal = SessionJournal(self.directory, flush_interval=60)
+        journal.snapshot({'turns': [1]})
+        journal.append('turn', 2)
+        journal.snapshot({'turns': [1, 2]})
+        journal.append('turn', 3)
+        journal.close()
+        state, records = SessionJournal(self.directory).load()
+        self.assertEqual(state, {'turns': [1, 2]})
+        self.assertEqual(records, [('turn', 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()